@@ -0,0 +1,134 @@
+from enum import Enum, auto
+from threading import RLock
+from typing import Callable, List, Union
+
+
+class LoopingBehavior(Enum):
+    INITIAL_ALERT = auto()
+    HANDLING_DELAY_SHORT = auto()
+    HANDLING_DELAY_MODERATE = auto()
+    HANDLING_DELAY_LONG = auto()
+    IC_DEFINED = auto()
+
+
+class Alert:
+    """
+    An active alert raised on a calling channel. due is the time at which its next announcement on the alert channel
+    should start; wait_length is the length of the wait which ends at due.
+    """
+    def __init__(self, ch: int, looping_behavior=LoopingBehavior.INITIAL_ALERT, transmit_args=(), delay_index=0
+                 , due=0.0, wait_length=0.0, caller_advised=False):
+        self.ch = ch
+        self.looping_behavior = looping_behavior
+        self.transmit_args = tuple(transmit_args)
+        self.delay_index = delay_index
+        self.due = due
+        self.wait_length = wait_length
+        self.caller_advised = caller_advised
+        self.last_announced = None
+
+    def to_dict(self, now) -> dict:
+        return {"channel": self.ch, "looping_behavior": self.looping_behavior.name
+                , "transmit_args": list(self.transmit_args), "delay_index": self.delay_index
+                , "due_in": self.due - now, "wait_length": self.wait_length, "caller_advised": self.caller_advised}
+
+    @staticmethod
+    def from_dict(data: dict, now) -> 'Alert':
+        """
+        Inverse of to_dict. Raises KeyError, TypeError or ValueError if data is not a valid alert.
+        """
+        if not isinstance(data["channel"], int) or not isinstance(data["delay_index"], int):
+            raise TypeError("Alert channel and delay index must be integers.")
+        return Alert(data["channel"], LoopingBehavior[data["looping_behavior"]], data["transmit_args"]
+                     , data["delay_index"], now + float(data["due_in"]), float(data["wait_length"])
+                     , bool(data["caller_advised"]))
+
+
+class AlertManager:
+    """
+    Tracks the active alerts and decides which is announced next. The alert whose announcement is due earliest goes
+    first; ties go to the alert announced least recently, so alerts sharing the alert channel take turns.
+    The manager never reads a clock: every method depending on time takes the current time from the caller, in seconds
+    on any monotonic scale, so that it can equally be driven in real or virtual time. Methods may be called from any
+    thread.
+    """
+    def __init__(self, delays: Callable[[LoopingBehavior], List[float]]):
+        """
+        :param delays: returns, for a looping behavior, the lengths of the successive waits after its announcements.
+        """
+        self._delays = delays
+        self._alerts = {}
+        self._lock = RLock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._alerts)
+
+    @property
+    def alerts(self) -> List[Alert]:
+        with self._lock:
+            return list(self._alerts.values())
+
+    def get(self, ch: int) -> Union[Alert, None]:
+        with self._lock:
+            return self._alerts.get(ch)
+
+    def add(self, ch: int, now) -> Alert:
+        """
+        Starts an alert on ch with its first announcement due now. Returns the existing alert if ch already has one.
+        """
+        with self._lock:
+            if ch not in self._alerts:
+                self._alerts[ch] = Alert(ch, due=now)
+            return self._alerts[ch]
+
+    def restore(self, alert: Alert):
+        with self._lock:
+            self._alerts[alert.ch] = alert
+
+    def remove(self, ch: int):
+        with self._lock:
+            self._alerts.pop(ch, None)
+
+    def next_due(self) -> Union[Alert, None]:
+        with self._lock:
+            if not self._alerts:
+                return None
+            return min(self._alerts.values()
+                       , key=lambda a: (a.due, float("-inf") if a.last_announced is None else a.last_announced))
+
+    def set_behavior(self, alert: Alert, looping_behavior: LoopingBehavior, now, *transmit_args):
+        """
+        Switches an alert to a new looping behavior, restarting its delays and making it due immediately.
+        """
+        with self._lock:
+            alert.looping_behavior = looping_behavior
+            alert.transmit_args = tuple(transmit_args)
+            alert.delay_index = 0
+            alert.due = now
+
+    def announced(self, alert: Alert, now):
+        """
+        Records that an alert was just announced and schedules its next announcement after the next of its delays.
+        """
+        with self._lock:
+            delays = self._delays(alert.looping_behavior)
+            alert.delay_index %= len(delays)
+            alert.wait_length = delays[alert.delay_index]
+            alert.delay_index = (alert.delay_index + 1) % len(delays)
+            alert.last_announced = now
+            alert.due = now + alert.wait_length
+
+    def make_due(self, alert: Alert, now):
+        """
+        Brings an alert's next announcement forward to now, keeping its looping behavior and the position in its delays.
+        """
+        with self._lock:
+            alert.due = now
+
+    def restart_wait(self, alert: Alert, now):
+        """
+        Postpones an alert's next announcement by restarting its current wait from now.
+        """
+        with self._lock:
+            alert.due = now + alert.wait_length
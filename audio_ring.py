@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import re
+from io import TextIOWrapper
+from multiprocessing import get_context
+from queue import Empty
+from subprocess import Popen, PIPE, STDOUT
+from threading import Thread
+from time import sleep
+from lazy_import import lazy_import
+
+numpy = lazy_import("numpy")
+shared_memory = lazy_import("multiprocessing.shared_memory")
+
+MULTIMON_DTMF_COMMAND = ["multimon-ng", "-a", "DTMF", "-"]
+DETECTED_DTMF_PATTERN = re.compile(r"DTMF\s*:\s*(?P<value>[0-9A-D#*])\s*")
+
+_HEADER_ALIGNMENT = 64  # bytes. Keeps the sample data cache-line aligned.
+_DEFAULT_POLL_INTERVAL = 0.010  # seconds
+
+
+class AudioRing:
+    """
+    Single-producer ring buffer of s16 audio frames in shared memory. The input stream callback appends frames with
+    write; readers in other processes attach by name and obtain views into the buffer without copying. All positions
+    are absolute frame counts since the ring was created.
+
+    The header holds the number of frames written followed by, for each channel, the number of frames a decoder has
+    consumed. Sample data is written before the write counter is advanced, so a reader never sees frames which are not
+    yet in place.
+    """
+    def __init__(self, capacity: int, channels: int, name=None):
+        self.capacity = capacity
+        self.channels = channels
+        header_size = -(-8 * (1 + channels) // _HEADER_ALIGNMENT) * _HEADER_ALIGNMENT
+        self._owner = name is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=header_size + 2 * capacity * channels)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._header = numpy.ndarray((1 + channels,), dtype=numpy.int64, buffer=self._shm.buf)
+        self._data = numpy.ndarray((capacity, channels), dtype="<i2", buffer=self._shm.buf, offset=header_size)
+        if self._owner:
+            self._header[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def written(self) -> int:
+        return int(self._header[0])
+
+    def fed(self, channel: int) -> int:
+        """
+        Returns the position up to which the decoder of the given channel has consumed audio.
+        """
+        return int(self._header[1 + channel])
+
+    def set_fed(self, channel: int, position: int):
+        self._header[1 + channel] = position
+
+    def write(self, block: numpy.ndarray):
+        """
+        Appends a block of frames with shape (frames, channels). Intended to be called from a single producer only.
+        """
+        position = self.written
+        frames = len(block)
+        if frames > self.capacity:
+            block = block[frames - self.capacity:]
+        start = (position + frames - len(block)) % self.capacity
+        first = min(len(block), self.capacity - start)
+        self._data[start:start + first] = block[:first]
+        self._data[:len(block) - first] = block[first:]
+        self._header[0] = position + frames
+
+    def view(self, start: int, stop: int):
+        """
+        Returns up to two views into the buffer which together hold frames [start, stop). Frames older than the capacity
+        of the ring have been overwritten, in which case an OverflowError is raised.
+        """
+        if self.written - start > self.capacity:
+            raise OverflowError(f"Frames from position {start} have already been overwritten.")
+        i, j = start % self.capacity, stop % self.capacity
+        if stop - start == 0:
+            return []
+        if i < j:
+            return [self._data[i:j]]
+        return [self._data[i:], self._data[:j]]
+
+    def close(self):
+        # Views must be released before the underlying buffer can be closed.
+        del self._header, self._data
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def condition_samples(samples: numpy.ndarray, gain: float, squelch_rms: float) -> numpy.ndarray:
+    """
+    Prepares mono s16 samples for decoding. If their RMS level, in sample units and measured before the gain is applied,
+    is below squelch_rms, silence is returned; otherwise, the samples are amplified by the linear gain and clipped.
+    """
+    if squelch_rms > 0 and numpy.sqrt(numpy.mean(numpy.square(samples, dtype=numpy.float64))) < squelch_rms:
+        return numpy.zeros_like(samples)
+    if gain == 1:
+        return samples
+    return numpy.clip(samples * gain, -32768, 32767).astype("<i2")
+
+
+class DecoderWorker:
+    """
+    A process running a persistent multimon-ng instance fed with one channel of an AudioRing. Detected tones are put
+    on the events queue as (tone character, position) pairs, where position is the number of frames fed to
+    multimon-ng when the tone was reported; the tone therefore lies at or before that position.
+    The samples are passed through condition_samples with the given gain and squelch_rms before decoding.
+    """
+    def __init__(self, ring: AudioRing, channel: int, gain=1.0, squelch_rms=0.0, poll_interval=_DEFAULT_POLL_INTERVAL):
+        self.ring = ring
+        self.channel = channel
+        # Forking a process which hosts PortAudio threads is unsafe, so the worker is started from a fresh interpreter.
+        ctx = get_context("spawn")
+        self.events = ctx.Queue()
+        self.process = ctx.Process(target=_decoder_worker_main, daemon=True
+                                   , args=(ring.name, ring.capacity, ring.channels, channel, gain, squelch_rms
+                                           , self.events, poll_interval))
+        self.process.start()
+
+    @property
+    def fed(self) -> int:
+        return self.ring.fed(self.channel)
+
+    def get_event(self, timeout):
+        """
+        Returns the next (tone character, position) pair, or None if there was none within timeout seconds. Raises a
+        RuntimeError if the worker process has exited.
+        """
+        try:
+            return self.events.get(timeout=timeout)
+        except Empty:
+            if not self.process.is_alive():
+                raise RuntimeError(f"Decoder worker for input channel {self.channel} exited"
+                                   f" with code {self.process.exitcode}.")
+            return None
+
+    def stop(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(1)
+
+
+def _decoder_worker_main(ring_name, capacity, channels, channel, gain, squelch_rms, events, poll_interval):
+    ring = AudioRing(capacity, channels, name=ring_name)
+    proc = Popen(MULTIMON_DTMF_COMMAND, stdout=PIPE, stdin=PIPE, stderr=STDOUT)
+
+    def forward_tones():
+        for line in TextIOWrapper(proc.stdout, encoding="utf-8"):
+            match = DETECTED_DTMF_PATTERN.match(line)
+            if match is not None:
+                events.put((match.group("value"), ring.fed(channel)))
+    Thread(target=forward_tones, daemon=True).start()
+
+    position = ring.written
+    ring.set_fed(channel, position)
+    while proc.poll() is None:
+        written = ring.written
+        if written == position:
+            sleep(poll_interval)
+            continue
+        # Skip ahead if we have fallen so far behind that the oldest unread frames were overwritten.
+        position = max(position, written - ring.capacity)
+        for segment in ring.view(position, written):
+            proc.stdin.write(condition_samples(segment[:, channel], gain, squelch_rms).tobytes())
+        proc.stdin.flush()
+        position = written
+        ring.set_fed(channel, position)
@@ -1,59 +1,244 @@
+from __future__ import annotations
+
 import atexit
-import re
+import os
 from enum import Enum, auto
 from io import TextIOWrapper
 from math import ceil
-from threading import RLock, Condition
+from pathlib import Path
+from threading import RLock, Condition, Event, Thread
 from types import SimpleNamespace
 from typing import Union
-import numpy
-import sounddevice
-import soundfile
-import samplerate as sr
 from subprocess import Popen, PIPE, STDOUT, DEVNULL
-from time import time, sleep
+from time import sleep, monotonic
 import lovely_logger as logging
+import metrics
+import systemd_notify
+import timing
+from audio_ring import AudioRing, DecoderWorker, DETECTED_DTMF_PATTERN, MULTIMON_DTMF_COMMAND, condition_samples
+from lazy_import import lazy_import
+from recorder import Recorder
 logger = logging.logger
 
+# Loaded on first use, so that importing this module, e.g. to check the configuration, neither takes long nor requires
+# working audio libraries.
+numpy = lazy_import("numpy")
+sounddevice = lazy_import("sounddevice")
+soundfile = lazy_import("soundfile")
+sr = lazy_import("samplerate")
+
 _loaded_files = {}
-_out_stream_data = SimpleNamespace(stream=None, cond=Condition(), playing_data=False, data=None, data_index=None)
+_out_stream_data = SimpleNamespace(stream=None, cond=Condition(), playing_data=False, data=None, data_index=None
+                                   , last_callback=None)
 
-_subprocess_copy = Popen(["multimon-ng", "-a", "DTMF", "-"], stdout=DEVNULL, stdin=PIPE, stderr=DEVNULL)
-atexit.register(_subprocess_copy.kill)
-_in_stream_data = SimpleNamespace(stream=None, lock=RLock(), piping_data=False, remaining_frames=0, proc=None)
-_DETECTED_DTMF_PATTERN = re.compile(r"DTMF\s*:\s*(?P<value>[0-9A-D#*])\s*")
+# energy holds, for each input channel, the sum of squared samples captured in total; captured_frames is their count.
+# resident_proc is an idle multimon-ng instance kept running while recordings are piped to new instances, which keeps
+# starting those fast. Recordings are piped even if decoder processes are used, for long tone sampling.
+_in_stream_data = SimpleNamespace(stream=None, ring=None, taps=[], last_callback=None, energy=None, captured_frames=0
+                                  , resident_proc=None, recorder=None)
+# usable is cleared while the streams are being reopened.
+_supervisor_data = SimpleNamespace(init_io_args=None, failed=False, usable=Event())
+_supervisor_data.usable.set()
 _SAFETY_WAIT_BUFFER = 0.005
+_decoder_start_jitter = timing.JitterStats("decoder_start", 10)
+_RING_LENGTH = 4  # seconds of input audio retained in the shared-memory ring.
+_DECODER_LAG = 0.020  # seconds. Audio fed to a decoder worker past the end of a recording before concluding it.
+_DECODER_EVENT_POLL = 0.050  # seconds
+_SUPERVISOR_CHECK_PERIOD = 0.5  # seconds
+_STREAM_STALL_TIMEOUT = 2  # seconds without a callback after which a running stream is considered dead.
+_RECOVERY_MAX_BACKOFF = 30  # seconds
+_RECOVERY_TIME_LIMIT = 300  # seconds. Audio is declared unrecoverable if reopening the streams fails for this long.
 
 
-def init_io(input_device=None, output_device=None, output_only=False):
+def init_io(input_device=None, output_device=None, output_only=False, decoder_processes=False, input_channels=1
+            , input_conditioning=()):
     """
     Sets the input and output audio devices; intended to be called once and before other operations. Default devices
     will be used if unspecified.
+    If decoder_processes is True, captured audio is written to a shared-memory ring read by persistent decoder worker
+    processes instead of being piped to a new multimon-ng instance for every recording. read_dtmf still pipes each of
+    its recordings to a new instance: a persistent one reports a held tone only once, when it begins.
+    Each of the input_channels opened on the input device is decoded independently, so that a different receiver may be
+    wired to each channel. Input channels are addressed by index in the functions awaiting DTMF tones.
+    input_conditioning may give, for each input channel in order, a (gain_db, squelch_dbfs) pair: the gain applied
+    before decoding and the level below which the channel's audio is decoded as silence. A squelch_dbfs of None
+    disables the squelch.
     """
+    _supervisor_data.init_io_args = (input_device, output_device, output_only, decoder_processes, input_channels
+                                     , input_conditioning)
     sounddevice.default.device = input_device, output_device
     sounddevice.check_output_settings(device=output_device)
-    if _out_stream_data.stream is not None:
+    if _out_stream_data.stream is not None and not _out_stream_data.stream.closed:
         _out_stream_data.stream.close()
     _out_stream_data.stream = sounddevice.OutputStream(device=output_device, channels=2, callback=_out_stream_callback
                                                        , finished_callback=_out_stream_finished_callback)
+    _out_stream_data.last_callback = monotonic()
     _out_stream_data.stream.start()
 
     if not output_only:
         sounddevice.check_input_settings(device=input_device)
-        if _in_stream_data.stream is not None:
+        if _in_stream_data.stream is not None and not _in_stream_data.stream.closed:
             _in_stream_data.stream.close()
-        # multimon-ng native format is s16le, 22050 Hz, mono.
-        _in_stream_data.stream = sounddevice.InputStream(device=input_device, dtype="<i2", samplerate=22050, channels=1,
-                                                         callback=_in_stream_callback)
+        # multimon-ng native format is s16le, 22050 Hz, mono. Each channel of the input is decoded separately.
+        _in_stream_data.stream = sounddevice.InputStream(device=input_device, dtype="<i2", samplerate=22050
+                                                         , channels=input_channels, callback=_in_stream_callback)
+        while len(_in_stream_data.taps) < input_channels:
+            _in_stream_data.taps.append(SimpleNamespace(lock=RLock(), piping_data=False, remaining_frames=0, proc=None
+                                                        , decoder=None, gain=1.0, squelch_rms=0.0, interrupt=None))
+        if _in_stream_data.energy is None or len(_in_stream_data.energy) != input_channels:
+            _in_stream_data.energy = numpy.zeros(input_channels)
+        for tap, (gain_db, squelch_dbfs) in zip(_in_stream_data.taps, input_conditioning):
+            tap.gain = 10 ** (gain_db / 20)
+            tap.squelch_rms = 0.0 if squelch_dbfs is None else 32768 * 10 ** (squelch_dbfs / 20)
+        if decoder_processes and _in_stream_data.ring is None:
+            _start_decoder_processes(ceil(_RING_LENGTH * _in_stream_data.stream.samplerate), input_channels)
+        if _in_stream_data.resident_proc is None:
+            _in_stream_data.resident_proc = Popen(MULTIMON_DTMF_COMMAND, stdout=DEVNULL, stdin=PIPE, stderr=DEVNULL)
+            atexit.register(_in_stream_data.resident_proc.kill)
+        _in_stream_data.last_callback = monotonic()
         _in_stream_data.stream.start()
 
 
+def supervise_streams():
+    """
+    Starts a thread which reopens the streams created by init_io if either is aborted, stops delivering callbacks or
+    loses its device. Reopening is retried with exponential backoff; if the streams cannot be reopened within
+    _RECOVERY_TIME_LIMIT seconds, subsequent playback and recording raise a RuntimeError. Playback and recording started
+    while the streams are being reopened wait for them, and their threads are not tracked by the systemd watchdog
+    meanwhile.
+    Stream errors are counted in the metrics audio_input_xruns, audio_output_xruns and audio_stream_recoveries.
+    """
+    def target():
+        while not _supervisor_data.failed:
+            sleep(_SUPERVISOR_CHECK_PERIOD)
+            problem = _stream_problem(_out_stream_data, "Output") or _stream_problem(_in_stream_data, "Input")
+            if problem is not None:
+                logger.error(f"{problem} Reopening audio streams.")
+                _recover_streams()
+    Thread(target=target, daemon=True).start()
+
+
+def _stream_problem(stream_data: SimpleNamespace, description: str) -> Union[str, None]:
+    stream = stream_data.stream
+    if stream is None:
+        return None
+    if not stream.active:
+        return f"{description} stream is no longer active."
+    if monotonic() - stream_data.last_callback > _STREAM_STALL_TIMEOUT:
+        return f"{description} stream has not called back for more than {_STREAM_STALL_TIMEOUT} s."
+    return None
+
+
+def _recover_streams():
+    start = monotonic()
+    backoff = 1
+    _supervisor_data.usable.clear()
+    while True:
+        _release_recordings()
+        try:
+            for stream_data in (_out_stream_data, _in_stream_data):
+                if stream_data.stream is not None and not stream_data.stream.closed:
+                    stream_data.stream.abort()
+                    stream_data.stream.close()
+            # PortAudio only enumerates devices when initialized, so a device which reappeared under a new index would
+            # not be found without reinitializing it.
+            sounddevice._terminate()
+            sounddevice._initialize()
+            init_io(*_supervisor_data.init_io_args)
+            metrics.increment("audio_stream_recoveries")
+            logger.info(f"Audio streams reopened after {monotonic() - start:.1f} s.")
+            _supervisor_data.usable.set()
+            return
+        except Exception:
+            logger.exception(f"Error reopening audio streams. Retrying in {backoff} s.")
+        if monotonic() - start + backoff > _RECOVERY_TIME_LIMIT:
+            logger.critical("Audio streams could not be reopened. Giving up.")
+            _supervisor_data.failed = True
+            _supervisor_data.usable.set()
+            _release_recordings()
+            with _out_stream_data.cond:
+                _out_stream_data.cond.notify_all()
+            return
+        sleep(backoff)
+        backoff = min(2 * backoff, _RECOVERY_MAX_BACKOFF)
+
+
+def _release_recordings():
+    """
+    Ends recordings in progress; the multimon-ng instances fed by a dead stream would otherwise wait forever.
+    """
+    for tap in _in_stream_data.taps:
+        with tap.lock:
+            if tap.piping_data:
+                tap.piping_data = False
+                tap.proc.kill()
+
+
+def _await_usable_streams():
+    """
+    Waits while the streams are being reopened, which may take longer than the step the calling thread announced to
+    the systemd watchdog, so the thread is no longer tracked meanwhile. Raises a RuntimeError if the streams were lost.
+    """
+    if not _supervisor_data.usable.is_set():
+        systemd_notify.idle()
+        _supervisor_data.usable.wait()
+    if _supervisor_data.failed:
+        raise RuntimeError("Audio streams were lost and could not be reopened.")
+
+
+def _start_decoder_processes(ring_capacity, input_channels):
+    _in_stream_data.ring = AudioRing(ring_capacity, input_channels)
+    for channel, tap in enumerate(_in_stream_data.taps[:input_channels]):
+        tap.decoder = DecoderWorker(_in_stream_data.ring, channel, tap.gain, tap.squelch_rms)
+    atexit.register(_stop_decoder_processes)
+
+
+def _stop_decoder_processes():
+    ring = _in_stream_data.ring
+    _in_stream_data.ring = None
+    for tap in _in_stream_data.taps:
+        if tap.decoder is not None:
+            tap.decoder.stop()
+            tap.decoder = None
+    ring.close()
+
+
 def load(filepath):
     """
     Loads audio data into memory. Data in memory will be used instead of reading from disk unless unload is called.
     """
+    _loaded_files[filepath] = _read_loaded_entry(filepath)
+
+
+def refresh(filepath, staged: Union[dict, None] = None) -> bool:
+    """
+    Loads the given file unless it is already loaded and has not changed on disk since. Returns True if the file was
+    (re)loaded.
+    If staged is given, the file is loaded into it instead of replacing the copy in use, which only happens once staged
+    is passed to publish.
+    """
+    if filepath in _loaded_files.keys():
+        stat = os.stat(filepath)
+        if _loaded_files[filepath][2] == (stat.st_mtime_ns, stat.st_size):
+            return False
+    if staged is None:
+        load(filepath)
+    else:
+        staged[filepath] = _read_loaded_entry(filepath)
+    return True
+
+
+def publish(staged: dict):
+    """
+    Puts the files loaded into staged by refresh into use.
+    """
+    _loaded_files.update(staged)
+
+
+def _read_loaded_entry(filepath) -> tuple:
+    stat = os.stat(filepath)
     data, samplerate = _read_audio_data(filepath)
-    _loaded_files[filepath] = (data, samplerate)
+    return data, samplerate, (stat.st_mtime_ns, stat.st_size)
 
 
 def _read_audio_data(filepath, converter_type='sinc_medium'):
@@ -81,6 +266,25 @@ def play(filepath, blocking=True):
     this OutputStream. Blocks until playback is finished or interrupted if blocking is True.
     """
     data, samplerate = _get_audio_data(filepath)
+    play_data(data, blocking)
+
+
+def render(*filepaths) -> numpy.ndarray:
+    """
+    Returns the audio data of the given files joined end to end, at the samplerate of the OutputStream, for playback
+    with play_data. Mono files are upmixed if they are joined with stereo ones.
+    """
+    parts = [_get_audio_data(filepath)[0] for filepath in filepaths]
+    parts = [part.reshape(len(part), -1) for part in parts]
+    channels = max(part.shape[1] for part in parts)
+    return numpy.concatenate([numpy.broadcast_to(part, (len(part), channels)) for part in parts])
+
+
+def play_data(data: numpy.ndarray, blocking=True):
+    """
+    Plays audio data at the samplerate of the OutputStream, as returned by render, in the same manner as play.
+    """
+    _await_usable_streams()
     _out_stream_data.playing_data = False
     with _out_stream_data.cond:
         _out_stream_data.cond.notify_all()
@@ -91,13 +295,20 @@ def play(filepath, blocking=True):
             _out_stream_data.cond.wait()
 
 
+def duration(data: numpy.ndarray) -> float:
+    """
+    Returns the playback length in seconds of audio data returned by render.
+    """
+    return len(data) / _out_stream_data.stream.samplerate
+
+
 def _get_audio_data(filepath):
     """
     Returns data, samplerate corresponding to audio file. Uses saved result in _loaded_files if present with correct
     samplerate; otherwise, reads from disc and does not save result in loaded_files.
     """
     if filepath in _loaded_files.keys():
-        data, samplerate = _loaded_files[filepath]
+        data, samplerate, _ = _loaded_files[filepath]
         if samplerate == _out_stream_data.stream.samplerate:
             return data, samplerate
     return _read_audio_data(filepath)
@@ -128,6 +339,9 @@ class Tone(Enum):
 
 def _out_stream_callback(outdata: numpy.ndarray, frames: int,
          time, status) -> None:
+    _out_stream_data.last_callback = monotonic()
+    if status.output_underflow:
+        metrics.increment("audio_output_xruns")
     if not _out_stream_data.playing_data:
         outdata[:] = 0
         return
@@ -151,8 +365,8 @@ def _out_stream_callback(outdata: numpy.ndarray, frames: int,
 def _out_stream_finished_callback() -> None:
     """
     As far as the OutputStream we use is concerned, it is always active and should never be aborted. If it somehow is
-    aborted, however, we notify any threads waiting for playback to finish. This will probably lead to an exception upon
-    the next attempt to use the stream.
+    aborted, however, we notify any threads waiting for playback to finish; the interrupted playback is not resumed.
+    If supervise_streams was called, the stream is then reopened.
     """
     with _out_stream_data.cond:
         _out_stream_data.playing_data = False
@@ -161,22 +375,88 @@ def _out_stream_finished_callback() -> None:
 
 def _in_stream_callback(indata: numpy.ndarray, frames: int,
                         time, status) -> None:
-    if not _in_stream_data.piping_data:
+    _in_stream_data.last_callback = monotonic()
+    if status.input_overflow:
+        metrics.increment("audio_input_xruns")
+    _in_stream_data.energy += numpy.square(indata, dtype=numpy.float64).sum(axis=0)
+    _in_stream_data.captured_frames += frames
+    recorder = _in_stream_data.recorder
+    if recorder is not None:
+        recorder.submit(indata)
+    ring = _in_stream_data.ring
+    if ring is not None:
+        ring.write(indata)
+    for channel, tap in enumerate(_in_stream_data.taps):
+        _pipe_to_tap(tap, indata[:, channel], frames)
+
+
+def _pipe_to_tap(tap: SimpleNamespace, samples: numpy.ndarray, frames: int) -> None:
+    if not tap.piping_data:
         return
-    with _in_stream_data.lock:
-        if not _in_stream_data.piping_data:
+    with tap.lock:
+        if not tap.piping_data:
             return
-        if _in_stream_data.remaining_frames is not None:
-            if frames >= _in_stream_data.remaining_frames:
-                _in_stream_data.piping_data = False
-                frames = _in_stream_data.remaining_frames
-            _in_stream_data.remaining_frames -= frames
-        _in_stream_data.proc.stdin.write(indata[:frames].tobytes(order='C'))
-        if not _in_stream_data.piping_data:
-            _in_stream_data.proc.stdin.close()
+        if tap.interrupt is not None and tap.interrupt.is_set():
+            tap.piping_data = False
+            frames = 0
+        elif tap.remaining_frames is not None:
+            if frames >= tap.remaining_frames:
+                tap.piping_data = False
+                frames = tap.remaining_frames
+            tap.remaining_frames -= frames
+        if frames > 0:
+            tap.proc.stdin.write(condition_samples(samples[:frames], tap.gain, tap.squelch_rms).tobytes(order='C'))
+        if not tap.piping_data:
+            tap.proc.stdin.close()
+
+
+def enable_recording(directory: Path):
+    """
+    Allows input audio to be recorded to FLAC files in directory between calls to start_recording and stop_recording.
+    Intended to be called once, after init_io.
+    """
+    _in_stream_data.recorder = Recorder(directory, int(_in_stream_data.stream.samplerate)
+                                        , _in_stream_data.stream.channels)
 
 
-def wait_for_dtmf_seq_predicate(max_rec_length=None, predicate=lambda s: True, max_seq_length=5, ignore_repeat_tones=False) -> Union[str, None]:
+def start_recording(name: str) -> Union[Path, None]:
+    """
+    Starts recording input audio to a new file whose name includes name, finishing any current recording. Returns the
+    path of the file, or None if recording was not enabled.
+    """
+    if _in_stream_data.recorder is None:
+        return None
+    return _in_stream_data.recorder.start(name)
+
+
+def stop_recording():
+    if _in_stream_data.recorder is not None:
+        _in_stream_data.recorder.stop()
+
+
+def input_level_mark(input_channel=0) -> tuple:
+    """
+    Returns a mark from which input_level_since measures the level of an input channel.
+    """
+    return float(_in_stream_data.energy[input_channel]), _in_stream_data.captured_frames
+
+
+def input_level_since(mark: tuple, input_channel=0) -> Union[float, None]:
+    """
+    Returns the RMS level, in dBFS, of the audio captured on an input channel since mark was taken, before any
+    conditioning, or None if no audio was captured since. Digital silence is reported as -inf.
+    """
+    energy, frames = mark
+    frames = _in_stream_data.captured_frames - frames
+    if frames <= 0:
+        return None
+    mean_square = max(float(_in_stream_data.energy[input_channel]) - energy, 0.0) / frames
+    return 10 * numpy.log10(mean_square / 32768 ** 2) if mean_square > 0 else float("-inf")
+
+
+def wait_for_dtmf_seq_predicate(max_rec_length=None, predicate=lambda s: True, max_seq_length=5, ignore_repeat_tones=False
+                                , input_channel=0, fresh_decoder=False, interrupt: Union[Event, None] = None
+                                ) -> Union[str, None]:
     """
     Await a sequence of DTMF tones satisfying the provided predicate. If multiple matches become immediately available,
     the longest will be returned. The predicate should test for valid sequences of DTMF tones; the behavior is undefined
@@ -186,62 +466,119 @@ def wait_for_dtmf_seq_predicate(max_rec_length=None, predicate=lambda s: True, m
     :param Real max_rec_length: maximum amount of audio data to be analyzed, in seconds. None specifies unlimited.
     :param bool ignore_repeat_tones: if true, detected tones that are the same as the one most recently received will
     not be appended to the retained sequence of tones being analyzed for matches.
+    :param int input_channel: the channel of the input device to listen to.
+    :param bool fresh_decoder: if true, the audio is piped to a new multimon-ng instance even if decoder processes are
+    used, so that a tone which began before the recording is still reported.
+    :param Event interrupt: if given, the wait ends once this event is set, returning None unless a match was already
+    found. The event is not cleared.
     """
-    input_latency = _in_stream_data.stream.latency
-    earliest_start = time() + input_latency + _SAFETY_WAIT_BUFFER
-    if _in_stream_data.proc is not None:
-        _in_stream_data.proc.kill()
-    _in_stream_data.proc = Popen(["multimon-ng", "-a", "DTMF", "-"], stdout=PIPE, stdin=PIPE, stderr=STDOUT)
-    wait_time = earliest_start - time()
-    if wait_time > 0:
-        sleep(wait_time)
-    _in_stream_data.remaining_frames = None if max_rec_length is None\
-        else ceil(max_rec_length * _in_stream_data.stream.samplerate)
-    _in_stream_data.piping_data = True
-    stdout = TextIOWrapper(_in_stream_data.proc.stdout, encoding="utf-8")
+    _await_usable_streams()
+    tap = _in_stream_data.taps[input_channel]
+    tones = _decoded_tones(max_rec_length, tap, interrupt) if _in_stream_data.ring is not None and not fresh_decoder\
+        else _piped_tones(max_rec_length, tap, interrupt)
     current_seq = "E" * max_seq_length
-    while True:
-        line = stdout.readline()
-        if line == "":
-            return None
-        match = _DETECTED_DTMF_PATTERN.match(line)
-        if match is not None:
-            tone_char = match.group("value")
+    try:
+        for tone_char in tones:
             if ignore_repeat_tones and tone_char == current_seq[len(current_seq) - 1]:
                 continue
             current_seq = current_seq[1:] + tone_char
-            matching_seq = None
             for i in range(max_seq_length):
                 candidate_seq = current_seq[i:]
                 if predicate(candidate_seq):
-                    matching_seq = candidate_seq
-                    break
-            if matching_seq is None:
-                continue
-            _in_stream_data.remaining_frames = 0  # Tell stream callback to stop in case we get starved acquiring lock.
-            kill_process = False
-            with _in_stream_data.lock:
-                if _in_stream_data.piping_data:
-                    kill_process = True
-                    _in_stream_data.piping_data = False
-            if kill_process:
-                _in_stream_data.proc.kill()
-                _in_stream_data.proc = None
-            return matching_seq
-
-
-def wait_for_dtmf_seq(max_rec_length=None, ignore_repeat_tones=False, *seqs) -> Union[str, None]:
+                    return candidate_seq
+        return None
+    finally:
+        tones.close()
+
+
+def _piped_tones(max_rec_length, tap: SimpleNamespace, interrupt: Union[Event, None] = None):
+    """
+    Starts a multimon-ng instance, pipes up to max_rec_length seconds of input into it and yields the detected tones.
+    Closing the generator stops the recording; so does setting interrupt, which the stream callback checks for each
+    block.
+    """
+    input_latency = _in_stream_data.stream.latency
+    earliest_start = timing.deadline_after(input_latency + _SAFETY_WAIT_BUFFER)
+    if tap.proc is not None:
+        tap.proc.kill()
+    tap.proc = Popen(MULTIMON_DTMF_COMMAND, stdout=PIPE, stdin=PIPE, stderr=STDOUT)
+    # Lateness here means that starting multimon-ng took longer than the input latency it overlaps with.
+    _decoder_start_jitter.record(timing.sleep_until(earliest_start))
+    tap.remaining_frames = None if max_rec_length is None\
+        else ceil(max_rec_length * _in_stream_data.stream.samplerate)
+    tap.interrupt = interrupt
+    with tap.lock:
+        # Checked under the lock, so that a recording is either not started or ended by _release_recordings.
+        tap.piping_data = _supervisor_data.usable.is_set()
+    if not tap.piping_data:
+        tap.proc.kill()
+        tap.proc = None
+        return
+    stdout = TextIOWrapper(tap.proc.stdout, encoding="utf-8")
+    try:
+        while True:
+            line = stdout.readline()
+            if line == "":
+                return
+            match = DETECTED_DTMF_PATTERN.match(line)
+            if match is not None:
+                yield match.group("value")
+    finally:
+        tap.remaining_frames = 0  # Tell stream callback to stop in case we get starved acquiring lock.
+        kill_process = False
+        with tap.lock:
+            tap.interrupt = None
+            if tap.piping_data:
+                kill_process = True
+                tap.piping_data = False
+        if kill_process:
+            tap.proc.kill()
+            tap.proc = None
+
+
+def _decoded_tones(max_rec_length, tap: SimpleNamespace, interrupt: Union[Event, None] = None):
+    """
+    Yields the tones reported by the decoder worker for up to max_rec_length seconds of audio captured from now on, or
+    until interrupt is set. Tones reported for earlier audio are discarded.
+    """
+    ring, decoder = _in_stream_data.ring, tap.decoder
+    samplerate = _in_stream_data.stream.samplerate
+    start = ring.written + ceil((_in_stream_data.stream.latency + _SAFETY_WAIT_BUFFER) * samplerate)
+    stop = None if max_rec_length is None else start + ceil((max_rec_length + _DECODER_LAG) * samplerate)
+    while True:
+        if interrupt is not None and interrupt.is_set():
+            return
+        finished = stop is not None and decoder.fed >= stop
+        event = decoder.get_event(0 if finished else _DECODER_EVENT_POLL)
+        if event is None:
+            _await_usable_streams()
+            if finished:
+                return
+            continue
+        tone_char, position = event
+        if position < start:
+            continue
+        if stop is not None and position > stop:
+            return
+        yield tone_char
+
+
+def wait_for_dtmf_seq(max_rec_length=None, ignore_repeat_tones=False, *seqs, input_channel=0) -> Union[str, None]:
     return wait_for_dtmf_seq_predicate(max_rec_length=max_rec_length, predicate=lambda s: s in seqs
                                        , max_seq_length=max(map(lambda s: len(s), seqs))
-                                       , ignore_repeat_tones=ignore_repeat_tones)
+                                       , ignore_repeat_tones=ignore_repeat_tones, input_channel=input_channel)
 
 
-def wait_for_dtmf_tone(max_rec_length=None, *tones) -> Union[Tone, None]:
+def wait_for_dtmf_tone(max_rec_length=None, *tones, input_channel=0) -> Union[Tone, None]:
     result = wait_for_dtmf_seq_predicate(max_rec_length, lambda s: s in map(lambda tone: tone.value, tones)
                                                          if len(tones) > 0 else lambda s: True
-                                         , max_seq_length=1)
+                                         , max_seq_length=1, input_channel=input_channel)
     return None if result is None else Tone(result)
 
 
-def read_dtmf():
-    return wait_for_dtmf_tone(0.040)
+def read_dtmf(input_channel=0) -> Union[Tone, None]:
+    """
+    Samples 40 ms of audio for a tone, including one held since before sampling started, as long tone detection needs.
+    """
+    result = wait_for_dtmf_seq_predicate(0.040, max_seq_length=1, input_channel=input_channel, fresh_decoder=True)
+    return None if result is None else Tone(result)
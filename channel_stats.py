@@ -0,0 +1,88 @@
+from pathlib import Path
+from threading import Lock
+from types import SimpleNamespace
+from typing import Union
+import checkpoint
+import metrics
+
+_NOISE_FALL_WEIGHT = 0.5  # The noise floor follows quieter levels quickly...
+_NOISE_RISE_WEIGHT = 0.05  # ...and louder ones slowly, so that occasional traffic barely raises it.
+_SIGNAL_WEIGHT = 0.2
+_MIN_NOISE_MEASUREMENTS = 10  # before the noise floor of a channel is trusted.
+_MIN_LEVEL = -96.0  # dBFS. Roughly the quantization noise of s16 audio; digital silence is counted as this level.
+
+
+class ChannelStats:
+    """
+    Keeps, for each radio channel, a running noise floor measured while no tone is heard and a running level of the
+    tones which are heard, both in dBFS. Methods may be called from any thread.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._channels = {}
+
+    def update_noise(self, ch: int, level: float):
+        with self._lock:
+            stats = self._stats(ch)
+            level = max(level, _MIN_LEVEL)
+            if stats.noise_floor is None:
+                stats.noise_floor = level
+            else:
+                weight = _NOISE_FALL_WEIGHT if level < stats.noise_floor else _NOISE_RISE_WEIGHT
+                stats.noise_floor += weight * (level - stats.noise_floor)
+            stats.noise_measurements += 1
+            metrics.set_gauge(f"channel_{ch}_noise_floor_dbfs", round(stats.noise_floor, 1))
+
+    def update_signal(self, ch: int, level: float):
+        with self._lock:
+            stats = self._stats(ch)
+            level = max(level, _MIN_LEVEL)
+            stats.signal = level if stats.signal is None else stats.signal + _SIGNAL_WEIGHT * (level - stats.signal)
+            metrics.set_gauge(f"channel_{ch}_signal_dbfs", round(stats.signal, 1))
+
+    def snr(self, ch: int, level: float) -> Union[float, None]:
+        """
+        Returns how far level, in dBFS, lies above the noise floor of ch, or None if the noise floor of ch is not yet
+        known well enough.
+        """
+        with self._lock:
+            stats = self._channels.get(ch)
+            if stats is None or stats.noise_measurements < _MIN_NOISE_MEASUREMENTS:
+                return None
+            return max(level, _MIN_LEVEL) - stats.noise_floor
+
+    def save(self, path: Path):
+        with self._lock:
+            checkpoint.save(path, {str(ch): vars(stats) for ch, stats in self._channels.items()})
+
+    def load(self, path: Path) -> bool:
+        """
+        Restores statistics saved by save. Returns False, leaving the statistics unchanged, if none could be read.
+        """
+        data = checkpoint.load(path)
+        if data is None:
+            return False
+        try:
+            channels = {int(ch): SimpleNamespace(noise_floor=_optional_float(saved["noise_floor"])
+                                                 , noise_measurements=int(saved["noise_measurements"])
+                                                 , signal=_optional_float(saved["signal"]))
+                        for ch, saved in data.items()}
+        except (KeyError, TypeError, ValueError):
+            return False
+        with self._lock:
+            self._channels = channels
+            for ch, stats in channels.items():
+                if stats.noise_floor is not None:
+                    metrics.set_gauge(f"channel_{ch}_noise_floor_dbfs", round(stats.noise_floor, 1))
+                if stats.signal is not None:
+                    metrics.set_gauge(f"channel_{ch}_signal_dbfs", round(stats.signal, 1))
+        return True
+
+    def _stats(self, ch: int) -> SimpleNamespace:
+        if ch not in self._channels:
+            self._channels[ch] = SimpleNamespace(noise_floor=None, noise_measurements=0, signal=None)
+        return self._channels[ch]
+
+
+def _optional_float(value) -> Union[float, None]:
+    return None if value is None else float(value)
@@ -0,0 +1,41 @@
+import json
+import os
+from pathlib import Path
+from typing import Union
+
+
+def save(path: Path, data: dict):
+    """
+    Writes data to path as JSON such that, even after a crash or power loss, path holds either the previous or the new
+    contents in full.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w") as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def load(path: Path) -> Union[dict, None]:
+    """
+    Returns the data saved at path, or None if there is none or it cannot be read.
+    """
+    try:
+        with path.open("r") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def clear(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
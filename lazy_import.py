@@ -0,0 +1,20 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    """
+    Returns the module with the given name without executing it; it is executed on first attribute access. Errors
+    raised while executing it, such as for a missing shared library, therefore only surface once it is used.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -1,56 +1,375 @@
+import os
 import re
+import signal
+from stat import S_ISREG
+import sys
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from functools import reduce
 from types import SimpleNamespace
 
 import lovely_logger as logging
 import time
 import toml
-from enum import Enum, auto
-from itertools import cycle
 from pathlib import Path
 from time import sleep
 from typing import Union, Dict
 from numbers import Real
 
-from audio_utils import Tone, wait_for_dtmf_tone, wait_for_dtmf_seq, wait_for_dtmf_seq_predicate, read_dtmf, load, init_io, play
+from audio_utils import Tone, wait_for_dtmf_tone, wait_for_dtmf_seq, wait_for_dtmf_seq_predicate, read_dtmf, refresh\
+    , publish, unload, init_io, play_data, render, supervise_streams, duration, input_level_mark, input_level_since\
+    , enable_recording, start_recording, stop_recording
 from rig_controller import RigController, PTT
+from alert_manager import Alert, AlertManager, LoopingBehavior
+from channel_stats import ChannelStats
+import checkpoint
+import metrics
+import systemd_notify
+import timing
+
+# Configuration fields which are only read at startup. Changes to these are ignored by a reload.
+_RESTART_REQUIRED_FIELDS = ("RIGCTLD_ADDRESS", "RIGCTLD_PORT", "SWITCH_TO_MEM_MODE", "DISABLE_PTT"
+                            , "RIGCTLD_OPERATION_TIMEOUT", "OUTPUT_AUDIO_DEVICE_SUBSTRING"
+                            , "INPUT_AUDIO_DEVICE_SUBSTRING", "DECODER_PROCESSES", "INPUT_CHANNELS"
+                            , "INPUT_CONDITIONING", "RECEIVERS", "CONFIG_WATCH_INTERVAL", "METRICS_LOG_INTERVAL"
+                            , "SCAN_MODE", "RECORD_AUDIO", "RECORDING_DIRECTORY", "REALTIME_PRIORITY", "CPU_AFFINITY"
+                            , "DEBUG_MODE")
+_PROGRESS_MARGIN = 5  # seconds. Allowance on top of the expected duration of a step before the watchdog is starved.
+_PTT_POLL_PERIOD = 0.050  # seconds
+_CHANNEL_STATS_SAVE_INTERVAL = 300  # seconds
+_LATENESS_TOLERANCE = 20  # ms. Lateness of a timed step beyond which it is counted as late in the metrics.
+_ALERT_COMMANDS = {"111", "222", "333", "444", "000", "*"}
+_SELECT_ALERT_PATTERN = re.compile(r"#\d\d")
+
+
+def _is_alert_command(seq: str) -> bool:
+    """
+    Tests for a command accepted during an alert. Besides the fixed commands, # followed by a two-digit channel selects
+    the alert on that channel.
+    """
+    return seq in _ALERT_COMMANDS or _SELECT_ALERT_PATTERN.fullmatch(seq) is not None
 
 
 class ARMS:
-    def __init__(self, cfg):
+    def __init__(self, cfg, cfg_path=None):
         self._cfg = cfg
+        self._cfg_path = cfg_path
+        # A reloaded configuration and the audio files read for it, awaiting _apply_pending_cfg.
+        self._pending_cfg = None
+        self._reload_requested = threading.Event()
         self._rigctlr = RigController(self._cfg.RIGCTLD_ADDRESS, self._cfg.RIGCTLD_PORT
                                       , self._cfg.RIGCTLD_OPERATION_TIMEOUT, disable_ptt=self._cfg.DISABLE_PTT
                                       , switch_to_mem_mode=self._cfg.SWITCH_TO_MEM_MODE)
+        # Additional receivers only scan; alert and test procedures always use the radio above.
+        self._receiver_rigctlrs = [RigController(receiver.RIGCTLD_ADDRESS, receiver.RIGCTLD_PORT
+                                                 , self._cfg.RIGCTLD_OPERATION_TIMEOUT, disable_ptt=True
+                                                 , switch_to_mem_mode=self._cfg.SWITCH_TO_MEM_MODE)
+                                   for receiver in self._cfg.RECEIVERS]
+        # Held by the main radio's scan loop for each channel it scans and by any procedure using the main radio.
+        self._radio_lock = threading.RLock()
+        self._in_alert_count = 0
+        self._in_alert_count_lock = threading.Lock()
+        self._alerts = AlertManager(self._loop_delays)
+        self._channel_stats = ChannelStats()
+        self._channel_stats_saved = time.monotonic()
+        self._scan_dwell_jitter = timing.JitterStats("scan_dwell", _LATENESS_TOLERANCE)
+        self._long_tone_jitter = timing.JitterStats("long_tone_sample", _LATENESS_TOLERANCE)
+        self._dcd_poll_jitter = timing.JitterStats("dcd_poll", _LATENESS_TOLERANCE)
+        # Guards _alerts_running, which is set while a thread runs the alert procedure for the active alerts, and
+        # serializes saving the alert checkpoint.
+        self._alerts_lock = threading.RLock()
+        self._alerts_running = False
+        # Set whenever _alerts_running is not. The main radio's scan loop waits on it, so that it does not compete with
+        # the alert procedure for the radio lock.
+        self._no_alerts_running = threading.Event()
+        self._no_alerts_running.set()
+        # Set when a receiver adds an alert while the alert procedure runs, which ends its wait for a command so that
+        # the new caller is advised promptly.
+        self._alert_added = threading.Event()
+        # Set once the radio fails to report its PTT state, after which key-up is no longer confirmed.
+        self._get_ptt_unsupported = False
+        # Renders transmissions while the channel is switched and ARMS waits for silence.
+        self._render_executor = ThreadPoolExecutor(max_workers=1)
 
     def begin_operation(self):
+        # Before any other thread is started, so that all of them inherit the scheduling settings.
+        timing.configure_scheduling(self._cfg.REALTIME_PRIORITY, self._cfg.CPU_AFFINITY)
+        systemd_notify.start()
         self._rigctlr.set_ptt(PTT.RX)
 
         if self._cfg.INVALID_CONFIGURATION:
             self._broadcast_errors()
             return
 
+        metrics.start_logging(self._cfg.METRICS_LOG_INTERVAL)
+        if self._channel_stats.load(self._cfg.CHANNEL_STATS_PATH):
+            logging.info("Loaded channel noise statistics.")
         self._init_audio_io()
-        self._load_audio_files()
-        self._set_not_in_alert_flag(True)
+        if self._cfg.RECORD_AUDIO:
+            enable_recording(self._cfg.RECORDING_DIRECTORY)
+        supervise_streams()
+        self._load_audio_files(self._cfg)
+        self._write_not_in_alert_flag(True)
+        self._resume_alerts()
+        if self._cfg_path is not None:
+            signal.signal(signal.SIGHUP, lambda signum, frame: self._reload_requested.set())
+            threading.Thread(target=self._watch_cfg, daemon=True).start()
 
         logging.info("ARMS is beginning operation.")
+        for receiver, rigctlr in zip(self._cfg.RECEIVERS, self._receiver_rigctlrs):
+            logging.info(f"Starting receiver on input channel {receiver.INPUT_CHANNEL};"
+                         f" channels: {receiver.CHANNELS}.")
+            threading.Thread(target=self._run_receiver, args=(rigctlr, receiver.CHANNELS, receiver.INPUT_CHANNEL)
+                             , daemon=True).start()
+        self._scan(self._rigctlr, None, 0)
+
+    def _run_receiver(self, rigctlr: RigController, channels, input_channel: int):
+        """
+        Scans with an additional receiver. An exception here would otherwise only end this thread, so the whole process
+        exits, as it would for an exception in the main scan loop, and is restarted by its service.
+        """
+        try:
+            self._scan(rigctlr, channels, input_channel)
+        except Exception:
+            logging.exception(f"Error while scanning with the receiver on input channel {input_channel}.")
+            os._exit(1)
+
+    def _scan(self, rigctlr: RigController, channels, input_channel: int):
+        """
+        Scans the given channels using the given radio, whose audio arrives on input_channel, and runs the alert or test
+        procedure upon detecting long tone zero or hash. If channels is None, the SCAN_CHANNELS of the configuration in
+        effect at the start of each pass are scanned.
+        The main radio's scan loop applies reloaded configurations. It does so between channels, while holding the radio
+        lock, so a new configuration never takes effect during a procedure.
+        If SCAN_MODE is "radio", the radio's own memory scan is used instead, falling back to scanning channel by
+        channel if the radio does not support it.
+        """
+        if self._cfg.SCAN_MODE == "radio":
+            self._radio_scan(rigctlr, channels, input_channel)
+        main_radio = rigctlr is self._rigctlr
+        while True:
+            for ch in self._cfg.SCAN_CHANNELS if channels is None else channels:
+                if main_radio:
+                    self._wait_for_alerts_to_end()
+                with self._holding_radio() if main_radio else nullcontext():
+                    if main_radio:
+                        self._apply_pending_cfg()
+                    self._expect_progress(self._cfg.TONE_DETECT_REC_LENGTH/1000)
+                    rigctlr.switch_channel(ch)
+                    tone = self._listen_for_tone(ch, input_channel)
+                    if tone is not None:
+                        self._handle_tone(tone, ch, input_channel)
+            if main_radio:
+                systemd_notify.ready()
+            self._save_channel_stats()
+
+    def _radio_scan(self, rigctlr: RigController, channels, input_channel: int):
+        """
+        Scans using the radio's memory scan, which steps through channels without a CAT command per channel. The radio
+        pauses on busy channels; while it reports an open squelch, ARMS reads the channel it stopped on and, if that
+        channel is scanned by this radio, listens there for tones. Upon hearing one, the radio's scan is stopped and the
+        radio kept on that channel for long tone detection and any procedure.
+        The radio's scan list must be programmed to cover the channels scanned. Returns only if the radio does not
+        support scanning, in which case the caller falls back to scanning channel by channel.
+        Other threads taking the main radio's lock stop its scan; it is restarted on the next poll.
+        """
+        main_radio = rigctlr is self._rigctlr
+        schedule = timing.PeriodicSchedule(self._cfg.DCD_SAMPLING_PERIOD/1000, self._dcd_poll_jitter)
         while True:
-            for ch in range(6, self._cfg.LAST_CHANNEL + 1):
+            if main_radio:
+                self._wait_for_alerts_to_end()
+            with self._holding_radio(stop_scan=False) if main_radio else nullcontext():
+                if main_radio:
+                    self._apply_pending_cfg()
+                scanned_channels = self._cfg.SCAN_CHANNELS if channels is None else channels
+                self._expect_progress(self._cfg.DCD_SAMPLING_PERIOD/1000)
+                if not rigctlr.scanning:
+                    try:
+                        rigctlr.start_scan()
+                    except ValueError:
+                        logging.warning("The radio could not start its memory scan. Falling back to software scanning.")
+                        metrics.increment("radio_scan_fallbacks")
+                        return
+                    if main_radio:
+                        systemd_notify.ready()
+                if rigctlr.get_dcd_is_open():
+                    try:
+                        ch = rigctlr.get_channel()
+                    except ValueError:
+                        logging.warning("The radio could not report the channel its scan stopped on. Falling back to"
+                                        " software scanning.")
+                        metrics.increment("radio_scan_fallbacks")
+                        rigctlr.stop_scan()
+                        return
+                    if ch in scanned_channels:
+                        metrics.increment("radio_scan_stops")
+                        self._expect_progress(self._cfg.TONE_DETECT_REC_LENGTH/1000)
+                        # The radio pauses on a channel because of a carrier, so the level heard is not noise.
+                        tone = self._listen_for_tone(ch, input_channel, update_noise=False)
+                        if tone is not None:
+                            rigctlr.stop_scan()
+                            rigctlr.switch_channel(ch)
+                            self._handle_tone(tone, ch, input_channel)
+                            self._save_channel_stats()
+                        # Listening is timed separately; polling resumes on a fresh schedule afterwards.
+                        schedule.restart()
+                        if tone is not None:
+                            continue
+            schedule.wait()
+
+    def _listen_for_tone(self, ch: int, input_channel: int, update_noise=True) -> Union[Tone, None]:
+        """
+        Listens on ch for the start of long tone zero or hash and returns the tone heard, if any stands far enough above
+        the noise floor of ch. Unless update_noise is False, the level heard when no tone is updates the noise floor.
+        """
+        level_mark = input_level_mark(input_channel)
+        dwell_end = timing.deadline_after(self._cfg.TONE_DETECT_REC_LENGTH/1000)
+        tone = wait_for_dtmf_tone(self._cfg.TONE_DETECT_REC_LENGTH/1000, Tone.ZERO, Tone.HASH
+                                  , input_channel=input_channel)
+        level = input_level_since(level_mark, input_channel)
+        if tone is None:
+            # Listening only ends early for a tone, so a full dwell's overrun is what decoder start-up and input
+            # latency add to each channel.
+            self._scan_dwell_jitter.record(time.monotonic_ns() - dwell_end)
+            if update_noise and level is not None:
+                self._channel_stats.update_noise(ch, level)
+            return None
+        if not self._tone_snr_sufficient(ch, level):
+            metrics.increment("scan_tones_below_snr")
+            return None
+        return tone
+
+    def _handle_tone(self, tone: Tone, ch: int, input_channel: int):
+        self._set_not_in_alert_flag(False)
+        if self._detect_long_tone(tone, ch, input_channel):
+            systemd_notify.ready()
+            self._start_procedure(tone, ch, input_channel)
+        self._set_not_in_alert_flag(True)
+
+    def _tone_snr_sufficient(self, ch: int, level: Union[float, None]) -> bool:
+        """
+        Tests whether a tone heard on ch at level dBFS stands at least TONE_MIN_SNR_DB above the noise floor of ch. Tones
+        are trusted while the noise floor of ch is not yet known or if TONE_MIN_SNR_DB is 0.
+        """
+        if self._cfg.TONE_MIN_SNR_DB <= 0 or level is None:
+            return True
+        snr = self._channel_stats.snr(ch, level)
+        return snr is None or snr >= self._cfg.TONE_MIN_SNR_DB
+
+    def _save_channel_stats(self):
+        if time.monotonic() - self._channel_stats_saved < _CHANNEL_STATS_SAVE_INTERVAL:
+            return
+        self._channel_stats_saved = time.monotonic()
+        try:
+            self._channel_stats.save(self._cfg.CHANNEL_STATS_PATH)
+        except Exception:
+            logging.exception("Error saving channel noise statistics. Continuing operation.")
+
+    def _start_procedure(self, tone: Tone, ch: int, input_channel: int):
+        """
+        Runs the test procedure or starts the alert procedure for a long tone detected on ch. If the alert procedure is
+        already running, a new alert is handed to it instead; tests are ignored until all alerts end.
+        """
+        with self._alerts_lock:
+            if tone == Tone.ZERO:
+                self._alerts.add(ch, time.monotonic())
+                # Before the caller is advised, which may take a while on a busy channel, so a crash cannot lose it.
+                self._save_alerts_checkpoint()
+                if self._alerts_running:
+                    logging.info(f"Long tone zero detected on channel {ch}. Adding it to the active alerts.")
+                    # The running alert procedure records to a new file from here on, one per alert.
+                    start_recording(f"alert_ch{ch:02d}")
+                    self._alert_added.set()
+                else:
+                    self._start_alert_procedure(f"alert_ch{ch:02d}", ch if input_channel == 0 else None)
+                return
+            elif self._alerts_running:
+                logging.info(f"Long tone hash detected on channel {ch}. Ignoring it while alerts are active.")
+                return
+        with self._holding_radio():
+            if input_channel != 0:
+                logging.info(f"Long tone detected on input channel {input_channel}.")
                 self._rigctlr.switch_channel(ch)
-                tone = wait_for_dtmf_tone(self._cfg.TONE_DETECT_REC_LENGTH/1000, Tone.ZERO, Tone.HASH)
-                if tone is not None:
-                    self._set_not_in_alert_flag(False)
-                    if self._detect_long_tone(tone):
-                        if tone == Tone.ZERO:
-                            self._alert_procedure(ch)
-                        elif tone == Tone.HASH:
-                            self._test_procedure(ch)
-                        logging.info("Returning to normal (scanning) operation.")
-                    self._set_not_in_alert_flag(True)
+            with self._recording(f"test_ch{ch:02d}"):
+                self._test_procedure(ch)
+        logging.info("Returning to normal (scanning) operation.")
+
+    def _start_alert_procedure(self, recording_name: str, radio_channel: Union[int, None]):
+        """
+        Starts the alert procedure for the active alerts on a thread of its own, so that the receiver which detected
+        an alert goes back to scanning. Must be called with _alerts_lock held.
+        :param radio_channel: the channel the main radio is known to be on, if any.
+        """
+        self._alerts_running = True
+        self._no_alerts_running.clear()
+        self._set_not_in_alert_flag(False)
+        threading.Thread(target=self._run_alert_procedure, args=(recording_name, radio_channel), daemon=True).start()
+
+    def _run_alert_procedure(self, recording_name: str, radio_channel: Union[int, None]):
+        """
+        As for the scan loops, an exception here ends the whole process, which is restarted by its service and resumes
+        the alerts from their checkpoint.
+        """
+        try:
+            with self._holding_radio(), self._recording(recording_name):
+                self._alert_procedure(radio_channel)
+        except Exception:
+            logging.exception("Error during the alert procedure.")
+            os._exit(1)
+        finally:
+            systemd_notify.idle()
+        logging.info("Returning to normal (scanning) operation.")
+        self._set_not_in_alert_flag(True)
+
+    def _wait_for_alerts_to_end(self):
+        if not self._no_alerts_running.is_set():
+            systemd_notify.idle()
+            self._no_alerts_running.wait()
+
+    @contextmanager
+    def _recording(self, name: str):
+        """
+        Records the input audio during a procedure, if RECORD_AUDIO is set, to a file whose name includes name. The
+        alert procedure starts a new file whenever an alert is added; the last one is finished on exit.
+        """
+        start_recording(name)
+        try:
+            yield
+        finally:
+            stop_recording()
+
+    @contextmanager
+    def _holding_radio(self, stop_scan=True):
+        """
+        Acquires the radio lock and, unless stop_scan is False, stops the radio's memory scan if it is running. The
+        calling thread is not expected to make progress while it waits for the lock, which may be held for a whole
+        procedure.
+        """
+        systemd_notify.idle()
+        with self._radio_lock:
+            if stop_scan and self._rigctlr.scanning:
+                self._rigctlr.stop_scan()
+            yield
+
+    def _expect_progress(self, seconds):
+        """
+        Tells the watchdog that the calling thread will next make progress after a step lasting about the given number of
+        seconds, which may include a rigctld command.
+        """
+        systemd_notify.progress(seconds + self._cfg.RIGCTLD_OPERATION_TIMEOUT + _PROGRESS_MARGIN)
 
     def _set_not_in_alert_flag(self, not_in_alert: bool):
+        """
+        Receivers may detect tones concurrently, so the flag is only set once every receiver has left its procedure.
+        """
+        with self._in_alert_count_lock:
+            self._in_alert_count += -1 if not_in_alert else 1
+            if self._in_alert_count != (0 if not_in_alert else 1):
+                return
+            self._write_not_in_alert_flag(not_in_alert)
+
+    def _write_not_in_alert_flag(self, not_in_alert: bool):
         try:
             if not_in_alert:
                 self._cfg.NOT_IN_ALERT_FLAG_PATH.touch(exist_ok=True)
@@ -63,159 +382,285 @@ class ARMS:
     def _broadcast_errors(self):
         logging.critical("ARMS has detected configuration errors. Broadcasting messages on alert channel.")
         self._init_audio_io(output_only=True)
+        systemd_notify.ready()
         while True:
             self._transmit_files(self._cfg.ARMS_BOOT_ERROR_PATH)
+            self._expect_progress(60)
             sleep(60)
 
-    def _alert_procedure(self, ch: int):
-        logging.info(f"Entering alert procedure; channel: {ch}.")
-        self._transmit_files(*self._cfg.PARAGRAPHS.ADVISE_CALLER_HEARD)
-
-        class LoopingBehavior(Enum):
-            INITIAL_ALERT = auto()
-            HANDLING_DELAY_SHORT = auto()
-            HANDLING_DELAY_MODERATE = auto()
-            HANDLING_DELAY_LONG = auto()
-            IC_DEFINED = auto()
-
-        def init_alert_transmit_procedure():
-            logging.info("Playing initial information on alert channel.")
+    def _alert_procedure(self, radio_channel: Union[int, None] = None):
+        """
+        Announces the active alerts on channel 1 and carries out operator commands until every alert is cancelled. The
+        caller on each alert's channel is first told that they were heard. Alerts may be added by other threads while
+        this runs; their announcements are interleaved according to the AlertManager.
+        Commands apply to the selected alert, which is the alert most recently announced unless operators select
+        another by entering # followed by its two-digit channel.
+        Announcements, commands and sweeps all leave the radio on channel 1. Waiting for a command ends early when a
+        receiver adds an alert, so that its caller is advised promptly.
+        :param radio_channel: the channel the main radio is known to be on, if any.
+        """
+        selected = None
+        awaiting_command = False
+        next_sweep = time.monotonic() + self._cfg.ALERT_SCAN_INTERVAL
+        while True:
+            # Cleared before the alerts are checked, so that an alert added from now on interrupts the next wait.
+            self._alert_added.clear()
+            with self._alerts_lock:
+                if len(self._alerts) == 0:
+                    self._alerts_running = False
+                    self._no_alerts_running.set()
+                    checkpoint.clear(self._cfg.ALERT_CHECKPOINT_PATH)
+                    return
+            for alert in self._alerts.alerts:
+                if not alert.caller_advised:
+                    logging.info(f"Entering alert procedure; channel: {alert.ch}.")
+                    self._transmit_files(*self._cfg.PARAGRAPHS.ADVISE_CALLER_HEARD
+                                         , channel=None if alert.ch == radio_channel else alert.ch)
+                    radio_channel = alert.ch
+                    alert.caller_advised = True
+                    awaiting_command = False
+                    self._save_alerts_checkpoint()
+            if radio_channel != 1:
+                self._rigctlr.switch_channel(1)
+                radio_channel = 1
+            alert = self._alerts.next_due()
+            if selected is None or self._alerts.get(selected.ch) is not selected:
+                selected = alert
+            now = time.monotonic()
+            if alert.due <= now:
+                self._announce(alert)
+                self._alerts.announced(alert, time.monotonic())
+                selected = alert
+                awaiting_command = False
+                self._save_alerts_checkpoint()
+                continue
+            wait = alert.due - now
+            if self._cfg.ALERT_SCAN_INTERVAL > 0:
+                if now >= next_sweep:
+                    self._sweep_for_alerts()
+                    next_sweep = time.monotonic() + self._cfg.ALERT_SCAN_INTERVAL
+                    awaiting_command = False
+                    continue
+                wait = min(wait, next_sweep - now)
+            if not awaiting_command:
+                logging.info("Awaiting command on channel 1.")
+                awaiting_command = True
+            self._expect_progress(wait)
+            seq = wait_for_dtmf_seq_predicate(wait, _is_alert_command, max_seq_length=3, interrupt=self._alert_added)
+            if seq is not None:
+                selected = self._alert_command(seq, selected)
+                awaiting_command = False
+                self._save_alerts_checkpoint()
+
+    def _announce(self, alert: Alert):
+        """
+        Plays the information corresponding to an alert's looping behavior. While several alerts are active, each
+        announcement identifies its alert's repeater.
+        """
+        ch = alert.ch
+        repeater_suffix = [self._repeater_name_path(ch)] if len(self._alerts) > 1 else []
+        if alert.looping_behavior == LoopingBehavior.INITIAL_ALERT:
+            logging.info(f"Playing initial information for channel {ch} on alert channel.")
             self._transmit_files(*self._cfg.PARAGRAPHS.INITIAL_ALERT, self._repeater_name_path(ch))
-
-        def handling_delay_base_transmit_procedure(looping_behavior: LoopingBehavior):
-            if looping_behavior == LoopingBehavior.HANDLING_DELAY_SHORT:
+        elif alert.looping_behavior == LoopingBehavior.IC_DEFINED:
+            self._transmit_files(*self._cfg.PARAGRAPHS.IC_DEFINED, self._operator_name_path(alert.transmit_args[0])
+                                 , *repeater_suffix)
+        else:
+            if alert.looping_behavior == LoopingBehavior.HANDLING_DELAY_SHORT:
                 delay_length_str = "short"
                 paragraph = self._cfg.PARAGRAPHS.SHORT_DELAY
-            elif looping_behavior == looping_behavior.HANDLING_DELAY_MODERATE:
+            elif alert.looping_behavior == LoopingBehavior.HANDLING_DELAY_MODERATE:
                 delay_length_str = "moderate"
                 paragraph = self._cfg.PARAGRAPHS.MODERATE_DELAY
-            elif looping_behavior == looping_behavior.HANDLING_DELAY_LONG:
+            elif alert.looping_behavior == LoopingBehavior.HANDLING_DELAY_LONG:
                 delay_length_str = "long"
                 paragraph = self._cfg.PARAGRAPHS.LONG_DELAY
             else:
                 raise ValueError
             logging.info("Playing ARMS_GOING_TO_CALLING_CHANNEL on alert channel.")
-            self._transmit_files(*self._cfg.PARAGRAPHS.ARMS_GOING_TO_CALLING_CHANNEL)
-            logging.info(f"Announcing {delay_length_str} delay on calling channel.")
-            self._rigctlr.switch_channel(ch)
-            self._transmit_files(*paragraph)
+            self._transmit_files(*self._cfg.PARAGRAPHS.ARMS_GOING_TO_CALLING_CHANNEL, *repeater_suffix)
+            logging.info(f"Announcing {delay_length_str} delay on calling channel {ch}.")
+            self._transmit_files(*paragraph, channel=ch)
             logging.info("Playing ARMS_IS_BACK_ON_ALERT_CHANNEL on alert channel.")
-            self._rigctlr.switch_channel(1)
-            self._transmit_files(*self._cfg.PARAGRAPHS.ARMS_IS_BACK_ON_ALERT_CHANNEL)
+            self._transmit_files(*self._cfg.PARAGRAPHS.ARMS_IS_BACK_ON_ALERT_CHANNEL, channel=1)
             logging.info(f"Announcing {delay_length_str} delay on alert channel.")
-            self._transmit_files(*paragraph)
-
-        def ic_defined_transmit_procedure(op_id: int):
-            self._transmit_files(*self._cfg.PARAGRAPHS.IC_DEFINED, self._operator_name_path(op_id))
-
-        delays_dict = {LoopingBehavior.INITIAL_ALERT: [self._cfg.INITIAL_ALERT_SHORT_DELAY_LENGTH] * self._cfg.INITIAL_ALERT_NUM_SHORT_DELAYS + [self._cfg.INITIAL_ALERT_LONG_DELAY_LENGTH]
-            , LoopingBehavior.HANDLING_DELAY_SHORT: [self._cfg.SHORT_DELAY_MESSAGE_LOOP_LENGTH]
-            , LoopingBehavior.HANDLING_DELAY_MODERATE: [self._cfg.MODERATE_DELAY_MESSAGE_LOOP_LENGTH]
-            , LoopingBehavior.HANDLING_DELAY_LONG: [self._cfg.LONG_DELAY_MESSAGE_LOOP_LENGTH]
-            , LoopingBehavior.IC_DEFINED: [self._cfg.IC_DEFINED_MESSAGE_LOOP_LENGTH]}
-
-        info_transmit_procedure_dict = {LoopingBehavior.INITIAL_ALERT: init_alert_transmit_procedure
-                                        , LoopingBehavior.IC_DEFINED: ic_defined_transmit_procedure}
-        for b in {LoopingBehavior.HANDLING_DELAY_SHORT, LoopingBehavior.HANDLING_DELAY_MODERATE, LoopingBehavior.HANDLING_DELAY_LONG}:
-            info_transmit_procedure_dict[b] = lambda local_b=b: handling_delay_base_transmit_procedure(local_b)
-
-        class State(Enum):
-            PLAYING_INFO = auto()
-            WAITING = auto()
-        states_iter = cycle(State)
-
-        cur_looping_data = SimpleNamespace(delays=delays_dict[LoopingBehavior.INITIAL_ALERT], delay_index=0
-                                           , info_transmit_procedure=init_alert_transmit_procedure
-                                           , states_iter=cycle(State))
-
-        def set_looping_data(looping_behavior: LoopingBehavior, reset_states_iter=True, *transmit_args):
-            cur_looping_data.delays = delays_dict[looping_behavior]
-            cur_looping_data.delay_index = 0
-            cur_looping_data.info_transmit_procedure = lambda: info_transmit_procedure_dict[looping_behavior](*transmit_args)
-            if reset_states_iter:
-                cur_looping_data.states_iter = cycle(State)
-
-        state = next(states_iter)
-        remain_at_same_state = True
-        self._rigctlr.switch_channel(1)
-        while True:
-            if remain_at_same_state:
-                remain_at_same_state = False
+            self._transmit_files(*paragraph, *repeater_suffix)
+
+    def _alert_command(self, seq: str, selected: Alert) -> Alert:
+        """
+        Carries out a command entered on channel 1 and returns the alert selected afterwards.
+        """
+        ch = selected.ch
+        if _SELECT_ALERT_PATTERN.fullmatch(seq):
+            alert = self._alerts.get(int(seq[1:]))
+            if alert is None:
+                logging.info(f"{seq} detected, but there is no alert on channel {seq[1:]}.")
+                return selected
+            logging.info(f"{seq} detected. Selecting the alert on channel {alert.ch}.")
+            self._transmit_files(self._repeater_name_path(alert.ch))
+            return alert
+        elif seq == "000":
+            logging.info("000 detected. Asking for confirmation before cancelling alert.")
+            self._transmit_files(*self._cfg.PARAGRAPHS.ALERT_CANCEL_CONFIRM)
+            self._expect_progress(self._cfg.CONFIRM_CANCEL_ALERT_TIMEOUT)
+            if wait_for_dtmf_seq(self._cfg.CONFIRM_CANCEL_ALERT_TIMEOUT, False, "000") == "000":
+                logging.info(f"Confirmation via 000 detected. Cancelling alert on channel {ch}.")
+                self._alerts.remove(ch)
+                returning_normal_op = self._cfg.PARAGRAPHS.ARMS_RETURNING_NORMAL_OP if len(self._alerts) == 0 else []
+                logging.info("Acknowledging cancellation on alert channel.")
+                self._transmit_files(*self._cfg.PARAGRAPHS.ALERT_CANCELLED, self._repeater_name_path(ch), *returning_normal_op)
+                logging.info("Acknowledging cancellation in calling channel.")
+                self._transmit_files(*self._cfg.PARAGRAPHS.ALERT_CANCELLED, self._repeater_name_path(ch), *returning_normal_op
+                                     , channel=ch)
+                if len(self._alerts) > 0:
+                    self._rigctlr.switch_channel(1)
             else:
-                state = next(states_iter)
-            if state == State.PLAYING_INFO:
-                cur_looping_data.info_transmit_procedure()
-            elif state == State.WAITING:
-                logging.info("Awaiting command on channel 1.")
-                seq = wait_for_dtmf_seq(cur_looping_data.delays[cur_looping_data.delay_index], False
-                                         , "111", "222", "333", "444", "000", "*")
-                if seq == "000":
-                    logging.info("000 detected. Asking for confirmation before cancelling alert.")
-                    self._transmit_files(*self._cfg.PARAGRAPHS.ALERT_CANCEL_CONFIRM)
-                    if wait_for_dtmf_seq(self._cfg.CONFIRM_CANCEL_ALERT_TIMEOUT, False, "000") == "000":
-                        logging.info("Confirmation via 000 detected. Cancelling alert procedure.")
-                        logging.info("Acknowledging cancellation on alert channel.")
-                        self._transmit_files(*self._cfg.PARAGRAPHS.ALERT_CANCELLED, self._repeater_name_path(ch), *self._cfg.PARAGRAPHS.ARMS_RETURNING_NORMAL_OP)
-                        logging.info("Acknowledging cancellation in calling channel.")
-                        self._rigctlr.switch_channel(ch)
-                        self._transmit_files(*self._cfg.PARAGRAPHS.ALERT_CANCELLED, self._repeater_name_path(ch), *self._cfg.PARAGRAPHS.ARMS_RETURNING_NORMAL_OP)
-                        return
-                    else:
-                        logging.info("Timeout reached while listening for confirmation to cancel alert. ARMS will"
-                                     " remain in its current state.")
-                        remain_at_same_state = True
-                        continue
-                elif seq == "111":
-                    logging.info("111 detected. Switching to initial alert announcements on channel 1.")
-                    set_looping_data(LoopingBehavior.INITIAL_ALERT)
-                    continue
-                elif seq == "222":
-                    logging.info("222 detected. Initiating short delay announcements.")
-                    set_looping_data(LoopingBehavior.HANDLING_DELAY_SHORT)
-                    continue
-                elif seq == "333":
-                    logging.info("333 detected. Initiating moderate delay announcements.")
-                    set_looping_data(LoopingBehavior.HANDLING_DELAY_MODERATE)
-                    continue
-                elif seq == "444":
-                    logging.info("444 detected. Initiating long delay announcements.")
-                    set_looping_data(LoopingBehavior.HANDLING_DELAY_LONG)
-                    continue
-                elif seq == "*":
-                    logging.info("* detected. Initiating operator identification.")
-                    op_id = self._detect_op_id()
-                    if op_id is None:
-                        logging.info("Timeout reached while listening for operator ID.")
-                        self._transmit_files(*self._cfg.PARAGRAPHS.IC_CODE_TIMED_OUT)
-                    elif op_id is False:
-                        logging.info("Invalid operator ID detected.")
-                        self._transmit_files(*self._cfg.PARAGRAPHS.IC_CODE_INVALID)
-                    else:
-                        logging.info("Detected ID: {:03d}.".format(op_id))
-                        if self._cfg.OPERATORS[op_id]:
-                            logging.info("The operator ID detected is active. Announcing this operator as in-command.")
-                            set_looping_data(LoopingBehavior.IC_DEFINED, True, op_id)
-                        else:
-                            logging.info("The operator ID detected is NOT active.")
-                            self._transmit_files(*self._cfg.PARAGRAPHS.IC_CODE_INVALID)
-                        continue
-                    logging.info("An operator was not successfully set as IC. ARMS will remain in its existing state.")
-                    remain_at_same_state = True
-                    continue
-                cur_looping_data.delay_index = (cur_looping_data.delay_index + 1) % len(cur_looping_data.delays)
+                logging.info("Timeout reached while listening for confirmation to cancel alert. ARMS will"
+                             " remain in its current state.")
+                self._alerts.restart_wait(selected, time.monotonic())
+        elif seq == "111":
+            logging.info("111 detected. Switching to initial alert announcements on channel 1.")
+            self._alerts.set_behavior(selected, LoopingBehavior.INITIAL_ALERT, time.monotonic())
+        elif seq == "222":
+            logging.info("222 detected. Initiating short delay announcements.")
+            self._alerts.set_behavior(selected, LoopingBehavior.HANDLING_DELAY_SHORT, time.monotonic())
+        elif seq == "333":
+            logging.info("333 detected. Initiating moderate delay announcements.")
+            self._alerts.set_behavior(selected, LoopingBehavior.HANDLING_DELAY_MODERATE, time.monotonic())
+        elif seq == "444":
+            logging.info("444 detected. Initiating long delay announcements.")
+            self._alerts.set_behavior(selected, LoopingBehavior.HANDLING_DELAY_LONG, time.monotonic())
+        elif seq == "*":
+            logging.info("* detected. Initiating operator identification.")
+            op_id = self._detect_op_id()
+            if op_id is None:
+                logging.info("Timeout reached while listening for operator ID.")
+                self._transmit_files(*self._cfg.PARAGRAPHS.IC_CODE_TIMED_OUT)
+            elif op_id is False:
+                logging.info("Invalid operator ID detected.")
+                self._transmit_files(*self._cfg.PARAGRAPHS.IC_CODE_INVALID)
+            else:
+                logging.info("Detected ID: {:03d}.".format(op_id))
+                if self._cfg.OPERATORS[op_id]:
+                    logging.info("The operator ID detected is active. Announcing this operator as in-command.")
+                    self._alerts.set_behavior(selected, LoopingBehavior.IC_DEFINED, time.monotonic(), op_id)
+                    return selected
+                else:
+                    logging.info("The operator ID detected is NOT active.")
+                    self._transmit_files(*self._cfg.PARAGRAPHS.IC_CODE_INVALID)
+                    # As before alerts were managed together, the alert's information is played again right away.
+                    self._alerts.make_due(selected, time.monotonic())
+                    return selected
+            logging.info("An operator was not successfully set as IC. ARMS will remain in its existing state.")
+            self._alerts.restart_wait(selected, time.monotonic())
+        return selected
+
+    def _sweep_for_alerts(self):
+        """
+        Briefly listens on each channel scanned by the main radio which has no active alert and adds an alert for each
+        channel where long tone zero is detected. Returns to channel 1 afterwards.
+        """
+        logging.info("Checking scanned channels for further alerts.")
+        for ch in self._cfg.SCAN_CHANNELS:
+            if self._alerts.get(ch) is not None:
+                continue
+            self._expect_progress(self._cfg.TONE_DETECT_REC_LENGTH/1000)
+            self._rigctlr.switch_channel(ch)
+            if wait_for_dtmf_tone(self._cfg.TONE_DETECT_REC_LENGTH/1000, Tone.ZERO) == Tone.ZERO\
+                    and self._detect_long_tone(Tone.ZERO, ch):
+                logging.info(f"Long tone zero detected on channel {ch} during the alert procedure.")
+                self._alerts.add(ch, time.monotonic())
+                self._save_alerts_checkpoint()
+                start_recording(f"alert_ch{ch:02d}")
+        self._rigctlr.switch_channel(1)
+
+    def _loop_delays(self, looping_behavior: LoopingBehavior):
+        if looping_behavior == LoopingBehavior.INITIAL_ALERT:
+            return [self._cfg.INITIAL_ALERT_SHORT_DELAY_LENGTH] * self._cfg.INITIAL_ALERT_NUM_SHORT_DELAYS\
+                + [self._cfg.INITIAL_ALERT_LONG_DELAY_LENGTH]
+        return [{LoopingBehavior.HANDLING_DELAY_SHORT: self._cfg.SHORT_DELAY_MESSAGE_LOOP_LENGTH
+                 , LoopingBehavior.HANDLING_DELAY_MODERATE: self._cfg.MODERATE_DELAY_MESSAGE_LOOP_LENGTH
+                 , LoopingBehavior.HANDLING_DELAY_LONG: self._cfg.LONG_DELAY_MESSAGE_LOOP_LENGTH
+                 , LoopingBehavior.IC_DEFINED: self._cfg.IC_DEFINED_MESSAGE_LOOP_LENGTH}[looping_behavior]]
+
+    def _save_alerts_checkpoint(self):
+        with self._alerts_lock:
+            now = time.monotonic()
+            try:
+                checkpoint.save(self._cfg.ALERT_CHECKPOINT_PATH
+                                , {"alerts": [alert.to_dict(now) for alert in self._alerts.alerts]
+                                   , "saved_at": time.time()})
+            except Exception:
+                logging.exception("Error saving alert checkpoint. Continuing operation.")
+
+    def _resume_alerts(self):
+        """
+        Starts the alert procedure for alerts interrupted by a crash or restart, if a recent enough checkpoint of them
+        exists. Announcements which became due while ARMS was not running are made immediately.
+        """
+        saved = checkpoint.load(self._cfg.ALERT_CHECKPOINT_PATH)
+        if saved is None:
+            return
+        try:
+            age = time.time() - saved["saved_at"]
+            saved_alerts = list(saved["alerts"])
+        except (KeyError, TypeError, ValueError):
+            saved_alerts = []
+        alerts = []
+        for data in saved_alerts:
+            # Without a real-time clock, the wall clock may step backwards at boot, making age negative.
+            alert = self._resumable_alert(data, time.monotonic() - max(age, 0))
+            if alert is not None:
+                alerts.append(alert)
+        if len(alerts) == 0:
+            logging.warning("Discarding invalid alert checkpoint.")
+        elif age > self._cfg.ALERT_RESUME_MAX_AGE:
+            logging.warning(f"Discarding alert checkpoint saved {age:.0f} s ago.")
+        else:
+            logging.info(f"Resuming alerts on channel(s) {', '.join(str(alert.ch) for alert in alerts)} from a"
+                         f" checkpoint saved {age:.1f} s ago.")
+            systemd_notify.ready()
+            with self._alerts_lock:
+                for alert in alerts:
+                    self._alerts.restore(alert)
+                self._start_alert_procedure(f"alert_ch{alerts[0].ch:02d}_resumed", None)
+            return
+        checkpoint.clear(self._cfg.ALERT_CHECKPOINT_PATH)
+
+    def _resumable_alert(self, data, saved_at) -> Union[Alert, None]:
+        """
+        Rebuilds an alert from its checkpoint, saved at the monotonic time saved_at. Returns None, logging why, if the
+        alert cannot be resumed. An alert whose IC operator is no longer active returns to initial alert announcements.
+        """
+        try:
+            alert = Alert.from_dict(data, saved_at)
+        except (KeyError, IndexError, TypeError, ValueError):
+            logging.warning("Discarding an invalid alert from the alert checkpoint.")
+            return None
+        if alert.ch not in range(6, self._cfg.LAST_CHANNEL + 1):
+            logging.warning(f"Discarding the checkpointed alert on channel {alert.ch}, which is not scanned.")
+            return None
+        if alert.looping_behavior == LoopingBehavior.IC_DEFINED\
+                and (len(alert.transmit_args) != 1 or not isinstance(alert.transmit_args[0], int)
+                     or not self._cfg.OPERATORS.get(alert.transmit_args[0], False)):
+            logging.warning(f"The IC of the checkpointed alert on channel {alert.ch} is no longer an active operator."
+                            f" Resuming it with initial alert announcements.")
+            self._alerts.set_behavior(alert, LoopingBehavior.INITIAL_ALERT, saved_at)
+        return alert
 
     def _test_procedure(self, ch):
         logging.info(f"Entering test procedure on channel {ch}.")
         self._transmit_files(*self._cfg.PARAGRAPHS.ENTER_OPERATOR_CODE)
+        self._expect_progress(self._cfg.TESTING_STAR_DETECT_TIMEOUT)
         if wait_for_dtmf_tone(self._cfg.TESTING_STAR_DETECT_TIMEOUT, Tone.STAR) == Tone.STAR:
             op_id = self._detect_op_id()
             if op_id not in {None, False} and self._cfg.OPERATORS[op_id]:
                 logging.info("Valid and active ID detected: {:03d}. Transmitting testing message on calling channel.".format(op_id))
                 self._transmit_files(self._operator_name_path(op_id), *self._cfg.PARAGRAPHS.TESTING)
+                self._expect_progress(2)
                 sleep(2)
                 logging.info("Transmitting testing message on alert channel.")
-                self._rigctlr.switch_channel(1)
-                self._transmit_files(self._operator_name_path(op_id), *self._cfg.PARAGRAPHS.TESTING)
+                self._transmit_files(self._operator_name_path(op_id), *self._cfg.PARAGRAPHS.TESTING, channel=1)
             elif op_id is False:
                 logging.info("Invalid or inactive ID detected. Transmitting message indicating this.")
                 self._transmit_files(*self._cfg.PARAGRAPHS.TESTING_CODE_INVALID)
@@ -226,31 +671,83 @@ class ARMS:
             logging.info("Timed out before detecting '*'. Transmitting message indicating this.")
             self._transmit_files(*self._cfg.PARAGRAPHS.TESTING_CODE_TIMED_OUT)
 
-    def _transmit_files(self, *filepaths):
+    def _transmit_files(self, *filepaths, channel=None):
+        """
+        Transmits the given files back to back, after switching to channel if one is given. The files are rendered in
+        the background while the channel is switched and ARMS waits for silence. The time taken by each stage is logged.
+        """
+        rendering = self._render_executor.submit(render, *filepaths)
+        stage_start = time.monotonic()
+        stage_times = {}
+
+        def end_stage(name):
+            nonlocal stage_start
+            now = time.monotonic()
+            stage_times[name] = now - stage_start
+            stage_start = now
+
+        if channel is not None:
+            self._rigctlr.switch_channel(channel)
+            end_stage("switch")
         self._wait_for_silence()
+        end_stage("silence")
+        data = rendering.result()
+        end_stage("render wait")
         logging.info("Transmitting audio.")
+        self._expect_progress(self._cfg.TRANSMIT_DELAY)
         self._rigctlr.set_ptt(PTT.TX)
-        sleep(self._cfg.TRANSMIT_DELAY)
-        for path in filepaths:
-            play(path)
-        self._rigctlr.set_ptt(PTT.RX)
+        # Playback raises if the audio streams are lost; the transmitter must not be left keyed.
+        try:
+            self._key_up_delay()
+            end_stage("key-up")
+            self._expect_progress(duration(data))
+            play_data(data)
+            end_stage("playback")
+        finally:
+            self._rigctlr.set_ptt(PTT.RX)
+        logging.info("Transmission stages: " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in stage_times.items())
+                     + ".")
+        for name, seconds in stage_times.items():
+            metrics.set_gauge(f"last_transmit_{name.replace(' ', '_').replace('-', '_')}_seconds", round(seconds, 3))
+
+    def _key_up_delay(self):
+        """
+        Waits after PTT is activated and before audio is played. If CONFIRMED_TRANSMIT_DELAY is configured, the radio is
+        polled and playback starts that long after it reports transmitting; TRANSMIT_DELAY remains the upper bound.
+        """
+        deadline = time.monotonic() + self._cfg.TRANSMIT_DELAY
+        if self._cfg.CONFIRMED_TRANSMIT_DELAY is not None and not self._cfg.DISABLE_PTT\
+                and not self._get_ptt_unsupported:
+            while time.monotonic() < deadline:
+                try:
+                    ptt = self._rigctlr.get_ptt()
+                except ValueError:
+                    logging.exception("The radio could not report its PTT state. Using TRANSMIT_DELAY from now on.")
+                    self._get_ptt_unsupported = True
+                    break
+                if ptt != PTT.RX:
+                    deadline = min(deadline, time.monotonic() + self._cfg.CONFIRMED_TRANSMIT_DELAY)
+                    break
+                sleep(_PTT_POLL_PERIOD)
+        sleep_time = deadline - time.monotonic()
+        if sleep_time > 0:
+            sleep(sleep_time)
 
     def _wait_for_silence(self):
         logging.info(f"Waiting for silence. "
                      f"({self._cfg.DCD_REQ_CONSEC_ZEROES} consecutive zeroes,"
                      f" {self._cfg.DCD_SAMPLING_PERIOD} ms sampling period.)")
         consec_dcd_0_count = 0
+        schedule = timing.PeriodicSchedule(self._cfg.DCD_SAMPLING_PERIOD/1000, self._dcd_poll_jitter)
         while True:
-            last_sample_time = time.time()
+            self._expect_progress(self._cfg.DCD_SAMPLING_PERIOD/1000)
             if self._rigctlr.get_dcd_is_open():
                 consec_dcd_0_count = 0
             else:
                 consec_dcd_0_count += 1
             if consec_dcd_0_count >= self._cfg.DCD_REQ_CONSEC_ZEROES:
                 break
-            sleep_time = last_sample_time + self._cfg.DCD_SAMPLING_PERIOD/1000 - time.time()
-            if sleep_time > 0:
-                sleep(sleep_time)
+            schedule.wait()
 
     def _wait_for_silence_and_tone(self, timeout_seconds, *tones) -> Union[Tone, None]:
         status = SimpleNamespace()
@@ -273,7 +770,7 @@ class ARMS:
             with status.cond:
                 if status.awaiting_silence:
                     status.awaiting_silence = False
-                    status.deadline = time.time() + timeout_seconds
+                    status.deadline = timing.deadline_after(timeout_seconds)
         silence_waiting_thread = threading.Thread(target=target)
         silence_waiting_thread.start()
         while True:
@@ -289,7 +786,7 @@ class ARMS:
             else:
                 logging.info("Silence criteria reached. Starting final timeout.")
                 with status.cond:
-                    timeout = status.deadline - time.time()
+                    timeout = timing.remaining(status.deadline)
                 silence_waiting_thread.join()
                 return wait_for_dtmf_tone(max(timeout, 0), *tones)
 
@@ -299,18 +796,97 @@ class ARMS:
     def _operator_name_path(self, op_id: int):
         return self._cfg.OPERATOR_NAME_DIRECTORY / "{:03d}.wav".format(op_id)
 
-    def _load_audio_files(self):
-        paragraph_files = set()
-        for par in self._cfg.REQUIRED_PARAGRAPHS:
-            for file in self._cfg.PARAGRAPHS.__dict__[par]:
-                paragraph_files.add(file)
-        for file in paragraph_files:
-            load(file)
-        for ch in range(6, self._cfg.LAST_CHANNEL + 1):
-            load(self._repeater_name_path(ch))
-        for op_id, active in self._cfg.OPERATORS.items():
+    def _audio_files(self, cfg) -> set:
+        files = set()
+        for par in cfg.REQUIRED_PARAGRAPHS:
+            for file in cfg.PARAGRAPHS.__dict__[par]:
+                files.add(file)
+        for ch in range(6, cfg.LAST_CHANNEL + 1):
+            files.add(self._repeater_name_path(ch))
+        for op_id, active in cfg.OPERATORS.items():
             if active:
-                load(self._operator_name_path(op_id))
+                files.add(self._operator_name_path(op_id))
+        return files
+
+    def _load_audio_files(self, cfg, staged: Union[dict, None] = None) -> int:
+        """
+        Loads the audio files used with the given configuration, skipping those already loaded and unchanged on disk.
+        If staged is given, the files read are loaded into it, to be published later. Returns the number of files read.
+        """
+        return sum(refresh(file, staged) for file in self._audio_files(cfg))
+
+    def _watch_cfg(self):
+        """
+        Reloads the configuration upon SIGHUP or, if CONFIG_WATCH_INTERVAL is positive, when the configuration file is
+        modified.
+        """
+        def cfg_stat():
+            try:
+                stat = os.stat(self._cfg_path)
+                return stat.st_mtime_ns, stat.st_size
+            except OSError:
+                logging.exception("Error checking configuration file for changes.")
+                return None
+
+        last_stat = cfg_stat()
+        while True:
+            interval = self._cfg.CONFIG_WATCH_INTERVAL
+            requested = self._reload_requested.wait(interval if interval > 0 else None)
+            self._reload_requested.clear()
+            stat = cfg_stat()
+            if requested or stat is not None and stat != last_stat:
+                last_stat = stat
+                self._reload_cfg()
+
+    def _reload_cfg(self):
+        """
+        Parses and validates the configuration file and loads any new or changed audio files it requires. A valid
+        configuration is then left for the main scan loop to apply; the audio files read are only put into use along
+        with it.
+        """
+        logging.info(f"Reloading configuration from {self._cfg_path}.")
+        try:
+            new_cfg = parse_cfg(self._cfg_path)
+        except Exception:
+            logging.exception("Error parsing reloaded configuration. Keeping the current configuration.")
+            return
+        if new_cfg.INVALID_CONFIGURATION:
+            logging.error("Reloaded configuration is invalid. Keeping the current configuration.")
+            return
+        for field in _RESTART_REQUIRED_FIELDS:
+            if getattr(new_cfg, field) != getattr(self._cfg, field):
+                logging.warning(f"{field} was changed, which only takes effect after restarting ARMS.")
+                setattr(new_cfg, field, getattr(self._cfg, field))
+        # The receivers keep scanning the channels they were started with, so the main radio's share is recomputed.
+        if any(ch > new_cfg.LAST_CHANNEL for receiver in new_cfg.RECEIVERS for ch in receiver.CHANNELS):
+            logging.error("LAST_CHANNEL no longer covers the channels of the running receivers. Keeping the current"
+                          " configuration.")
+            return
+        new_cfg.SCAN_CHANNELS = _scan_channels(new_cfg.LAST_CHANNEL, new_cfg.RECEIVERS)
+        if len(new_cfg.SCAN_CHANNELS) == 0:
+            logging.error("The running receivers would leave the main radio no channel to scan. Keeping the current"
+                          " configuration.")
+            return
+        staged_files = {}
+        try:
+            loaded_count = self._load_audio_files(new_cfg, staged_files)
+        except Exception:
+            logging.exception("Error loading audio for reloaded configuration. Keeping the current configuration.")
+            return
+        logging.info(f"Reloaded configuration validated; {loaded_count} audio file(s) loaded. It will take effect"
+                     f" once ARMS is scanning.")
+        self._pending_cfg = new_cfg, staged_files
+
+    def _apply_pending_cfg(self):
+        pending, self._pending_cfg = self._pending_cfg, None
+        if pending is None:
+            return
+        new_cfg, staged_files = pending
+        for file in self._audio_files(self._cfg) - self._audio_files(new_cfg):
+            unload(file)
+        publish(staged_files)
+        self._cfg = new_cfg
+        logging.info("Reloaded configuration is now in effect.")
 
     def _init_audio_io(self, output_only=False):
         """
@@ -320,25 +896,35 @@ class ARMS:
         for i in range(4):
             try:
                 init_io(self._cfg.INPUT_AUDIO_DEVICE_SUBSTRING
-                        , self._cfg.OUTPUT_AUDIO_DEVICE_SUBSTRING, output_only)
+                        , self._cfg.OUTPUT_AUDIO_DEVICE_SUBSTRING, output_only, self._cfg.DECODER_PROCESSES
+                        , self._cfg.INPUT_CHANNELS, self._cfg.INPUT_CONDITIONING)
             except Exception:
                 if i < 3:
                     sleep(3)
                 else:
                     raise
 
-    def _sleep_millis(self, millis: float):
-        sleep(millis / 1000)
-
-    def _detect_long_tone(self, tone: Tone):
+    def _detect_long_tone(self, tone: Tone, ch: int, input_channel=0):
+        """
+        Samples the audio of ch for a long tone. Samples in which the tone does not stand far enough above the noise
+        floor of ch are not counted as positive; the level of the others updates the signal statistics of ch.
+        """
+        self._expect_progress(self._cfg.LONG_TONE_TOTAL_SAMPLES * self._cfg.LONG_TONE_SAMPLING_PERIOD/1000)
         pos_sample_count = 0
-        start_time = time.time()
+        start = time.monotonic_ns()
         for i in range(self._cfg.LONG_TONE_TOTAL_SAMPLES):
-            sleep_ms = i * self._cfg.LONG_TONE_SAMPLING_PERIOD - 1000 * (time.time() - start_time)
-            if sleep_ms > 0:
-                self._sleep_millis(sleep_ms)
-            if read_dtmf() == tone:
-                pos_sample_count += 1
+            # Samples are scheduled from the start rather than from each other, so lateness does not accumulate.
+            self._long_tone_jitter.record(
+                timing.sleep_until(timing.deadline_after(i * self._cfg.LONG_TONE_SAMPLING_PERIOD/1000, start)))
+            level_mark = input_level_mark(input_channel)
+            if read_dtmf(input_channel) == tone:
+                level = input_level_since(level_mark, input_channel)
+                if self._tone_snr_sufficient(ch, level):
+                    pos_sample_count += 1
+                    if level is not None:
+                        self._channel_stats.update_signal(ch, level)
+                else:
+                    metrics.increment("long_tone_samples_below_snr")
         return pos_sample_count >= self._cfg.LONG_TONE_REQUIRED_POSITIVE_SAMPLES and pos_sample_count <= self._cfg.LONG_TONE_MAX_POSITIVE_SAMPLES
 
     def _detect_op_id(self) -> Union[int, bool, None]:
@@ -362,6 +948,7 @@ class ARMS:
                 op_id = int(substr)
                 return op_id if _valid_id(op_id) else False
 
+        self._expect_progress(self._cfg.OPERATOR_ID_TIMEOUT)
         match = wait_for_dtmf_seq_predicate(max_rec_length=self._cfg.OPERATOR_ID_TIMEOUT, max_seq_length=4
                                            , ignore_repeat_tones=True
                                            , predicate=lambda s: validity(s) is not None)
@@ -381,6 +968,14 @@ def _valid_id(id: int):
     return units_digit == (tens_digit + 5) % 10
 
 
+def _scan_channels(last_channel: int, receivers) -> list:
+    """
+    Returns the channels scanned by the main radio: those up to last_channel which none of the receivers scans.
+    """
+    receiver_channels = {ch for receiver in receivers for ch in receiver.CHANNELS}
+    return [ch for ch in range(6, last_channel + 1) if ch not in receiver_channels]
+
+
 def parse_cfg(cfg_path):
     cfg_dict = toml.load(cfg_path)
     cfg = SimpleNamespace()
@@ -424,6 +1019,10 @@ def parse_cfg(cfg_path):
     if not verify_field(cfg.TRANSMIT_DELAY, lambda d: isinstance(d, Real) and d >= 0
                  , "TRANSMIT_DELAY must be a non-negative number of seconds."):
         cfg.TRANSMIT_DELAY = 1
+    cfg.CONFIRMED_TRANSMIT_DELAY = cfg_dict.get('CONFIRMED_TRANSMIT_DELAY', None)
+    if not verify_field(cfg.CONFIRMED_TRANSMIT_DELAY, lambda d: d is None or isinstance(d, Real) and d >= 0
+                        , "CONFIRMED_TRANSMIT_DELAY must be a non-negative number of seconds or left unspecified."):
+        cfg.CONFIRMED_TRANSMIT_DELAY = None
 
     cfg.INITIAL_ALERT_SHORT_DELAY_LENGTH = cfg_dict.get('INITIAL_ALERT_SHORT_DELAY_LENGTH', 5)  # seconds
     cfg.INITIAL_ALERT_NUM_SHORT_DELAYS = cfg_dict.get('INITIAL_ALERT_NUM_SHORT_DELAYS', 2)
@@ -478,6 +1077,27 @@ def parse_cfg(cfg_path):
     verify_field(cfg.LONG_TONE_MAX_POSITIVE_SAMPLES, lambda n: isinstance(n, int) and n > 0
                  , "LONG_TONE_MAX_POSITIVE_SAMPLES must be a positive integer.")
 
+    cfg.RECORD_AUDIO = cfg_dict.get('RECORD_AUDIO', False)
+    verify_field(cfg.RECORD_AUDIO, lambda b: isinstance(b, bool), "RECORD_AUDIO must be a boolean.")
+    cfg.RECORDING_DIRECTORY = cfg_dict.get('RECORDING_DIRECTORY', "recordings/")
+    verify_field(cfg.RECORDING_DIRECTORY, lambda s: isinstance(s, str), "RECORDING_DIRECTORY must be a string.", True)
+    cfg.RECORDING_DIRECTORY = Path(cfg.RECORDING_DIRECTORY)
+
+    cfg.REALTIME_PRIORITY = cfg_dict.get('REALTIME_PRIORITY', 0)
+    verify_field(cfg.REALTIME_PRIORITY, lambda p: isinstance(p, int) and 0 <= p <= 99
+                 , "REALTIME_PRIORITY must be an integer from 0 to 99.", True)
+    cfg.CPU_AFFINITY = cfg_dict.get('CPU_AFFINITY', [])
+    verify_field(cfg.CPU_AFFINITY, lambda cpus: isinstance(cpus, list)
+                 and all(isinstance(cpu, int) and cpu >= 0 for cpu in cpus)
+                 , "CPU_AFFINITY must be a list of CPU numbers.", True)
+
+    cfg.SCAN_MODE = cfg_dict.get('SCAN_MODE', "software")
+    verify_field(cfg.SCAN_MODE, lambda m: m in ("software", "radio"), 'SCAN_MODE must be "software" or "radio".')
+
+    cfg.TONE_MIN_SNR_DB = cfg_dict.get('TONE_MIN_SNR_DB', 0)  # dB
+    verify_field(cfg.TONE_MIN_SNR_DB, lambda t: isinstance(t, Real) and t >= 0
+                 , "TONE_MIN_SNR_DB must be a non-negative number of decibels.")
+
     cfg.DCD_SAMPLING_PERIOD = cfg_dict.get('DCD_SAMPLING_PERIOD', 200)  # ms
     cfg.DCD_REQ_CONSEC_ZEROES = cfg_dict.get('DCD_REQ_CONSEC_ZEROES',
                                              6)  # number of consecutive zero samples to conclude silence
@@ -495,6 +1115,79 @@ def parse_cfg(cfg_path):
     cfg.INPUT_AUDIO_DEVICE_SUBSTRING = cfg_dict.get('INPUT_AUDIO_DEVICE_SUBSTRING', None)
     verify_field(cfg.INPUT_AUDIO_DEVICE_SUBSTRING, lambda s: s is None or isinstance(s, str)
                  , "INPUT_AUDIO_DEVICE_SUBSTRING must be a string or left unspecified.")
+    cfg.CONFIG_WATCH_INTERVAL = cfg_dict.get('CONFIG_WATCH_INTERVAL', 5)  # seconds
+    verify_field(cfg.CONFIG_WATCH_INTERVAL, lambda t: isinstance(t, Real) and t >= 0
+                 , "CONFIG_WATCH_INTERVAL must be a non-negative number of seconds.", True)
+    cfg.ALERT_SCAN_INTERVAL = cfg_dict.get('ALERT_SCAN_INTERVAL', 0)  # seconds
+    verify_field(cfg.ALERT_SCAN_INTERVAL, lambda t: isinstance(t, Real) and t >= 0
+                 , "ALERT_SCAN_INTERVAL must be a non-negative number of seconds.")
+    cfg.ALERT_RESUME_MAX_AGE = cfg_dict.get('ALERT_RESUME_MAX_AGE', 3600)  # seconds
+    verify_field(cfg.ALERT_RESUME_MAX_AGE, lambda t: isinstance(t, Real) and t >= 0
+                 , "ALERT_RESUME_MAX_AGE must be a non-negative number of seconds.", True)
+    cfg.METRICS_LOG_INTERVAL = cfg_dict.get('METRICS_LOG_INTERVAL', 600)  # seconds
+    verify_field(cfg.METRICS_LOG_INTERVAL, lambda t: isinstance(t, Real) and t >= 0
+                 , "METRICS_LOG_INTERVAL must be a non-negative number of seconds.", True)
+    cfg.DECODER_PROCESSES = cfg_dict.get('DECODER_PROCESSES', False)
+    verify_field(cfg.DECODER_PROCESSES, lambda b: isinstance(b, bool), 'DECODER_PROCESSES must be "true" or "false"', True)
+    cfg.INPUT_GAIN_DB = cfg_dict.get('INPUT_GAIN_DB', 0)
+    cfg.INPUT_SQUELCH_DBFS = cfg_dict.get('INPUT_SQUELCH_DBFS', None)
+    verify_field(cfg.INPUT_GAIN_DB, lambda g: isinstance(g, Real)
+                 , "INPUT_GAIN_DB must be a number of decibels.", True)
+    verify_field(cfg.INPUT_SQUELCH_DBFS, lambda l: l is None or isinstance(l, Real) and l <= 0
+                 , "INPUT_SQUELCH_DBFS must be a non-positive number of dBFS or left unspecified.", True)
+
+    cfg.RECEIVERS = cfg_dict.get("RECEIVERS", [])
+
+    def receivers_predicate(receivers):
+        if not isinstance(receivers, list):
+            return False
+        assigned_channels = set()
+        input_channels = {0}
+        for receiver in receivers:
+            if not isinstance(receiver, dict):
+                return False
+            input_channel = receiver.get("INPUT_CHANNEL")
+            channels = receiver.get("CHANNELS")
+            if not isinstance(input_channel, int) or input_channel in input_channels\
+                    or not isinstance(receiver.get("RIGCTLD_PORT"), int)\
+                    or not isinstance(receiver.get("RIGCTLD_ADDRESS", ""), str)\
+                    or not isinstance(receiver.get("GAIN_DB", 0), Real)\
+                    or not isinstance(receiver.get("SQUELCH_DBFS", 0), Real) or receiver.get("SQUELCH_DBFS", 0) > 0\
+                    or not isinstance(channels, list) or len(channels) == 0:
+                return False
+            for ch in channels:
+                if not isinstance(ch, int) or ch < 6 or not last_channel_valid or ch > cfg.LAST_CHANNEL\
+                        or ch in assigned_channels:
+                    return False
+                assigned_channels.add(ch)
+            input_channels.add(input_channel)
+        # The main radio's scan loop applies reloaded configurations, so it must have a channel to scan.
+        return not last_channel_valid or not assigned_channels.issuperset(range(6, cfg.LAST_CHANNEL + 1))
+
+    verify_field(cfg.RECEIVERS, receivers_predicate, """
+Additional receivers, each wired to its own channel of the input device, should be specified as follows:
+
+[[RECEIVERS]]
+INPUT_CHANNEL = 1  # Channel of the input device, counting from 0. Channel 0 is used by the main radio.
+RIGCTLD_PORT = 4533
+CHANNELS = [11, 12, 13, 14]  # Channels scanned by this receiver instead of by the main radio.
+GAIN_DB = 0  # Optional.
+SQUELCH_DBFS = -60  # Optional; at most 0. Leave out to disable.
+
+Every input channel may be used by one receiver only, every channel must lie between 6 and LAST_CHANNEL, no channel
+may be assigned to more than one receiver and at least one channel must be left for the main radio to scan.
+""", True)
+    cfg.RECEIVERS = [SimpleNamespace(INPUT_CHANNEL=receiver["INPUT_CHANNEL"], CHANNELS=receiver["CHANNELS"]
+                                     , RIGCTLD_ADDRESS=receiver.get("RIGCTLD_ADDRESS", cfg.RIGCTLD_ADDRESS)
+                                     , RIGCTLD_PORT=receiver["RIGCTLD_PORT"], GAIN_DB=receiver.get("GAIN_DB", 0)
+                                     , SQUELCH_DBFS=receiver.get("SQUELCH_DBFS", None))
+                     for receiver in cfg.RECEIVERS]
+    cfg.INPUT_CHANNELS = 1 + max([receiver.INPUT_CHANNEL for receiver in cfg.RECEIVERS], default=0)
+    cfg.INPUT_CONDITIONING = [(0, None)] * cfg.INPUT_CHANNELS
+    cfg.INPUT_CONDITIONING[0] = (cfg.INPUT_GAIN_DB, cfg.INPUT_SQUELCH_DBFS)
+    for receiver in cfg.RECEIVERS:
+        cfg.INPUT_CONDITIONING[receiver.INPUT_CHANNEL] = (receiver.GAIN_DB, receiver.SQUELCH_DBFS)
+    cfg.SCAN_CHANNELS = _scan_channels(cfg.LAST_CHANNEL, cfg.RECEIVERS) if last_channel_valid else []
 
     cfg.DEBUG_MODE = cfg_dict.get('DEBUG_MODE', False)
     if cfg.DEBUG_MODE:
@@ -516,6 +1209,10 @@ def parse_cfg(cfg_path):
     cfg.OPERATOR_NAME_DIRECTORY = cfg.AUDIO_DIRECTORY / "operator_name/"
     cfg.ARMS_BOOT_ERROR_PATH = cfg.AUDIO_DIRECTORY / "ARMS_boot_error.wav"
 
+    # Audio files recur across paragraphs, so each is only checked once. Checking with stat and access rather than
+    # opening each file keeps validation fast.
+    readable_paths = {}
+
     def verify_path_readable(path: Union[Path, str], directory:Union[Path, None]=None):
         if not isinstance(path, Path) and not isinstance(path, str):
             return False
@@ -523,13 +1220,12 @@ def parse_cfg(cfg_path):
             path = directory / path
         elif not isinstance(path, Path):
             path = Path(path)
-        try:
-            with path.open("r") as file:
-                if not file.readable():
-                    return False
-        except IOError:
-            return False
-        return True
+        if path not in readable_paths:
+            try:
+                readable_paths[path] = S_ISREG(os.stat(path).st_mode) and os.access(path, os.R_OK)
+            except (OSError, ValueError):
+                readable_paths[path] = False
+        return readable_paths[path]
 
     verify_field(cfg.ARMS_BOOT_ERROR_PATH, verify_path_readable
                  , f"The necessary file '{cfg.ARMS_BOOT_ERROR_PATH}' is either missing or could not be read.", True)
@@ -626,18 +1322,39 @@ The following paragraphs, and only the following paragraphs, must be defined:
     cfg.PARAGRAPHS = SimpleNamespace(**{par_name: [cfg.AUDIO_DIRECTORY/path for path in paths] for par_name, paths in cfg.PARAGRAPHS.items()})
 
     cfg.NOT_IN_ALERT_FLAG_PATH = Path("not_in_alert")
+    cfg.ALERT_CHECKPOINT_PATH = Path("alert_checkpoint.json")
+    cfg.CHANNEL_STATS_PATH = Path("channel_stats.json")
 
     return cfg
 
 
+def check_cfg(cfg_path) -> bool:
+    """
+    Validates the configuration at cfg_path, including that the audio files it refers to are readable, without
+    starting ARMS or touching audio devices or the radio. Problems are logged.
+    """
+    try:
+        cfg = parse_cfg(cfg_path)
+    except (TypeError, ValueError, OSError):
+        logging.exception("Error parsing configuration.")
+        return False
+    return not cfg.INVALID_CONFIGURATION
+
+
 if __name__ == '__main__':
+    if sys.argv[1:] == ["--check-config"]:
+        # Without logging.init, problems found are printed to stderr and nothing is written to the log file.
+        if check_cfg("arms_config.toml"):
+            print("The configuration is valid.")
+            sys.exit(0)
+        sys.exit(1)
     Path("logs/").mkdir(exist_ok=True)
     logging.init("logs/log_file.log", level=logging.INFO)
     try:
         cfg = parse_cfg("arms_config.toml")
         if cfg.DEBUG_MODE:
             logging.logger.setLevel(logging.DEBUG)
-        arms = ARMS(cfg)
+        arms = ARMS(cfg, "arms_config.toml")
         arms.begin_operation()
     except TypeError:
         logging.exception("Error parsing configuration.")
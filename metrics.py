@@ -0,0 +1,41 @@
+from threading import Lock, Thread
+from time import sleep
+import lovely_logger as logging
+
+logger = logging.logger
+
+_lock = Lock()
+_counters = {}
+_gauges = {}
+
+
+def increment(name: str, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def set_gauge(name: str, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot() -> dict:
+    """
+    Returns the current value of every counter and gauge, keyed by name.
+    """
+    with _lock:
+        return {**_counters, **_gauges}
+
+
+def start_logging(interval):
+    """
+    Starts a thread writing all metrics to the log every interval seconds. An interval of 0 disables logging.
+    """
+    if interval <= 0:
+        return
+
+    def target():
+        while True:
+            sleep(interval)
+            logger.info("Metrics: " + ", ".join(f"{name}={value}" for name, value in sorted(snapshot().items())))
+    Thread(target=target, daemon=True).start()
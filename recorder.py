@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from queue import Queue, Full, Empty
+from threading import Thread
+import lovely_logger as logging
+import metrics
+from lazy_import import lazy_import
+
+logger = logging.logger
+soundfile = lazy_import("soundfile")
+
+_QUEUE_BLOCKS = 1000  # Blocks of input audio which may await writing before further blocks are dropped.
+_IDLE_CLOSE_DELAY = 1  # seconds. How long the writer waits for more audio before finishing a stopped recording.
+
+
+class Recorder:
+    """
+    Records input audio to FLAC files, one per recording, in a directory. submit is intended to be called from the input
+    stream callback and never blocks: blocks are handed to a writer thread through a bounded queue, and blocks arriving
+    while the queue is full are dropped and counted in the metric recording_dropped_frames.
+    """
+    def __init__(self, directory: Path, samplerate: int, channels: int):
+        self.directory = directory
+        self.samplerate = samplerate
+        self.channels = channels
+        self._queue = Queue(maxsize=_QUEUE_BLOCKS)
+        # The path of the current recording, or None. Each recording has its own Path object, so that a recording
+        # started with the same name is told apart by identity.
+        self._recording = None
+        self._dropped_frames = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        Thread(target=self._write, daemon=True).start()
+
+    def start(self, name: str) -> Path:
+        """
+        Finishes the current recording, if any, and starts a new one whose file name includes name and the time.
+        """
+        self._recording = self.directory / f"{datetime.now():%Y%m%d-%H%M%S}_{name}.flac"
+        return self._recording
+
+    def stop(self):
+        self._recording = None
+
+    def submit(self, block):
+        recording = self._recording
+        if recording is None:
+            return
+        try:
+            self._queue.put_nowait((recording, block.copy()))
+        except Full:
+            self._dropped_frames += len(block)
+            metrics.increment("recording_dropped_frames", len(block))
+
+    def _write(self):
+        file = None
+        current = None
+        dropped_at_start = 0
+        while True:
+            try:
+                recording, block = self._queue.get(timeout=_IDLE_CLOSE_DELAY)
+            except Empty:
+                recording, block = None, None
+                if current is None or self._recording is current:
+                    continue
+            if recording is not current:
+                if file is not None:
+                    self._finish(file, current, self._dropped_frames - dropped_at_start)
+                    file = None
+                current = recording
+                dropped_at_start = self._dropped_frames
+                if current is not None:
+                    try:
+                        file = soundfile.SoundFile(str(current), "w", self.samplerate, self.channels, subtype="PCM_16"
+                                                   , format="FLAC")
+                        logger.info(f"Recording input audio to {current}.")
+                    except Exception:
+                        logger.exception(f"Error creating recording {current}. Its audio will be discarded.")
+            if file is not None and block is not None:
+                try:
+                    file.write(block)
+                except Exception:
+                    logger.exception(f"Error writing recording {current}. The rest of its audio will be discarded.")
+                    self._finish(file, current, self._dropped_frames - dropped_at_start)
+                    file = None
+
+    @staticmethod
+    def _finish(file, path: Path, dropped_frames: int):
+        try:
+            file.close()
+        except Exception:
+            logger.exception(f"Error closing recording {path}.")
+            return
+        if dropped_frames > 0:
+            logger.warning(f"Finished recording {path}; {dropped_frames} frames were dropped because writing fell"
+                           f" behind.")
+        else:
+            logger.info(f"Finished recording {path}.")
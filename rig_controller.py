@@ -39,6 +39,7 @@ class RigController:
         self.sct.connect((address, port))
         self.sct.settimeout(timeout)
         self.disable_ptt = disable_ptt
+        self.scanning = False
         if switch_to_mem_mode:
             self._switch_to_memory_mode()
 
@@ -50,9 +51,26 @@ class RigController:
         if not self.disable_ptt:
             self._send_command(f"\\set_ptt {ptt.value}")
 
+    def get_ptt(self) -> PTT:
+        return PTT(int(self._send_command("\\get_ptt", parse_response=True)["PTT"]))
+
     def switch_channel(self, channel: int):
         self._send_command(f"\\set_mem {channel}")
 
+    def get_channel(self) -> int:
+        return int(self._send_command("\\get_mem", parse_response=True)["Memory#"])
+
+    def start_scan(self):
+        """
+        Starts the radio's memory scan. Raises a ValueError if the rig or its backend does not support it.
+        """
+        self._send_command("\\scan MEM 0")
+        self.scanning = True
+
+    def stop_scan(self):
+        self._send_command("\\scan STOP 0")
+        self.scanning = False
+
     def get_dcd_is_open(self):
         return int(self._send_command("\\get_dcd", parse_response=True)["DCD"]) == 1
 
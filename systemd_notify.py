@@ -0,0 +1,81 @@
+import os
+import socket
+from threading import Lock, Thread, current_thread
+from time import monotonic, sleep
+from types import SimpleNamespace
+import lovely_logger as logging
+
+logger = logging.logger
+
+# deadlines maps each tracked thread to the time by which it must next make progress.
+_watchdog_data = SimpleNamespace(lock=Lock(), deadlines={}, ready=False)
+
+
+def notify(message: str) -> bool:
+    """
+    Sends a message to the service manager per sd_notify(3). Returns False if ARMS is not running under systemd.
+    """
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address:
+        return False
+    if address.startswith("@"):
+        address = "\0" + address[1:]
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sct:
+        sct.connect(address)
+        sct.sendall(message.encode())
+    return True
+
+
+def ready():
+    """
+    Tells the service manager that startup is complete. Only the first call has any effect.
+    """
+    with _watchdog_data.lock:
+        if _watchdog_data.ready:
+            return
+        _watchdog_data.ready = True
+    notify("READY=1")
+
+
+def progress(within):
+    """
+    Records that the calling thread has made progress and will do so again within the given number of seconds. The
+    watchdog is only fed while no thread is overdue. A thread is no longer tracked once it exits.
+    """
+    with _watchdog_data.lock:
+        _watchdog_data.deadlines[current_thread()] = monotonic() + within
+
+
+def idle():
+    """
+    Stops tracking the calling thread's progress, e.g. while it legitimately waits on another thread.
+    """
+    with _watchdog_data.lock:
+        _watchdog_data.deadlines.pop(current_thread(), None)
+
+
+def start():
+    """
+    Starts feeding the systemd watchdog, if the service has one, at half its timeout. WATCHDOG_PID is not checked:
+    ARMS is started through su, so it never matches, and the unit relies on NotifyAccess=all instead.
+    """
+    watchdog_usec = os.environ.get("WATCHDOG_USEC")
+    if not watchdog_usec:
+        return
+    interval = int(watchdog_usec) / 2e6
+
+    def target():
+        overdue = False
+        while True:
+            sleep(interval)
+            now = monotonic()
+            with _watchdog_data.lock:
+                for thread in [thread for thread in _watchdog_data.deadlines if not thread.is_alive()]:
+                    del _watchdog_data.deadlines[thread]
+                healthy = all(deadline > now for deadline in _watchdog_data.deadlines.values())
+            if healthy:
+                notify("WATCHDOG=1")
+            elif not overdue:
+                logger.critical("ARMS has stopped making progress. No longer feeding the systemd watchdog.")
+            overdue = not healthy
+    Thread(target=target, daemon=True).start()
@@ -0,0 +1,112 @@
+import os
+from threading import Lock
+from time import monotonic_ns, sleep
+from typing import Iterable, Union
+import lovely_logger as logging
+import metrics
+
+logger = logging.logger
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_MS = 1_000_000
+
+
+def deadline_after(seconds: float, start: Union[int, None] = None) -> int:
+    """
+    Returns the monotonic_ns time the given number of seconds after start, or after now if start is None.
+    """
+    return (monotonic_ns() if start is None else start) + round(seconds * NS_PER_SECOND)
+
+
+def remaining(deadline: int) -> float:
+    """
+    Returns the number of seconds until deadline, a monotonic_ns time; negative if it has passed.
+    """
+    return (deadline - monotonic_ns()) / NS_PER_SECOND
+
+
+def sleep_until(deadline: int) -> int:
+    """
+    Sleeps until deadline, a monotonic_ns time. Returns how late, in nanoseconds, the caller resumes; this is positive
+    even without sleeping if the deadline had already passed.
+    """
+    delay = deadline - monotonic_ns()
+    if delay > 0:
+        sleep(delay / NS_PER_SECOND)
+    return monotonic_ns() - deadline
+
+
+class JitterStats:
+    """
+    Keeps statistics of how late a loop reaches its deadlines and publishes them as the metrics <name>_late_ms_mean and
+    <name>_late_ms_max, and the count of deadlines missed by more than tolerance_ms as <name>_late_count. Methods may
+    be called from any thread.
+    """
+    def __init__(self, name: str, tolerance_ms: float):
+        self.name = name
+        self._tolerance = tolerance_ms * NS_PER_MS
+        self._lock = Lock()
+        self._count = 0
+        self._total = 0
+        self._max = 0
+
+    def record(self, lateness: int):
+        """
+        :param lateness: nanoseconds by which a deadline was missed, as returned by sleep_until. Negative values, for
+        steps finishing early, count as 0.
+        """
+        lateness = max(lateness, 0)
+        with self._lock:
+            self._count += 1
+            self._total += lateness
+            self._max = max(self._max, lateness)
+            metrics.set_gauge(f"{self.name}_late_ms_mean", round(self._total / self._count / NS_PER_MS, 1))
+            metrics.set_gauge(f"{self.name}_late_ms_max", round(self._max / NS_PER_MS, 1))
+        if lateness > self._tolerance:
+            metrics.increment(f"{self.name}_late_count")
+
+
+class PeriodicSchedule:
+    """
+    Deadlines every period seconds, starting from when the schedule is created. A step overrunning a whole period
+    restarts the schedule from when it ended, rather than the following steps running back to back to catch up.
+    """
+    def __init__(self, period: float, jitter: JitterStats):
+        self._period = round(period * NS_PER_SECOND)
+        self._jitter = jitter
+        self._deadline = monotonic_ns()
+
+    def wait(self):
+        """
+        Sleeps until the next deadline and records how late it was reached.
+        """
+        self._deadline += self._period
+        lateness = sleep_until(self._deadline)
+        self._jitter.record(lateness)
+        if lateness > self._period:
+            self._deadline = monotonic_ns()
+
+    def restart(self):
+        self._deadline = monotonic_ns()
+
+
+def configure_scheduling(realtime_priority: int = 0, cpus: Iterable[int] = ()):
+    """
+    Gives the calling thread SCHED_FIFO scheduling with the given priority, if positive, and pins it to the given CPUs,
+    if any. Threads and processes started afterwards inherit both, so this is intended to be called at startup from the
+    main thread. Each setting which the platform does not support or the process is not permitted to make is logged
+    and skipped.
+    """
+    if realtime_priority > 0:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(realtime_priority))
+            logger.info(f"Using SCHED_FIFO scheduling with priority {realtime_priority}.")
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not set real-time scheduling priority: {e}")
+    cpus = set(cpus)
+    if cpus:
+        try:
+            os.sched_setaffinity(0, cpus)
+            logger.info(f"Pinned to CPU(s) {', '.join(map(str, sorted(cpus)))}.")
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not set CPU affinity: {e}")